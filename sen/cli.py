@@ -23,6 +23,7 @@ import logging
 
 import sen
 from sen import set_logging
+from sen.constants import EVENTS_COALESCE_WINDOW
 from sen.exceptions import TerminateApplication
 from sen.tui.init import Application
 from sen.util import get_log_file_path, log_last_traceback
@@ -40,6 +41,11 @@ def main():
         default=False,
         help="Don't prompt when performing irreversible actions, a.k.a. YOLO!"
     )
+    parser.add_argument(
+        "--events-window", metavar="SECONDS", type=float, default=EVENTS_COALESCE_WINDOW,
+        help="Realtime events of a single object received within this window are processed "
+             "at once (default: %(default)s)"
+    )
     exclusive_group = parser.add_mutually_exclusive_group()
     exclusive_group.add_argument(
             "--debug", action="store_true", default=None,
@@ -60,7 +66,7 @@ def main():
     logger.info("application started")
 
     try:
-        app = Application(yolo=args.yolo)
+        app = Application(yolo=args.yolo, events_window=args.events_window)
     except TerminateApplication as ex:
         print("Error: {0}".format(str(ex)), file=sys.stderr)
         return 1
@@ -3,3 +3,21 @@ LOG_FILE_NAME = "sen.debug.log"
 FALLBACK_LOG_PATH = "/tmp/sen.debug.log"
 
 ISO_DATETIME_PARSE_STRING = "%Y-%m-%dT%H:%M:%S.%f"
+
+# worker threads of the user interface: long-running tasks and quick UI operations
+BACKGROUND_WORKERS = 4
+UI_WORKERS = 2
+# how many objects can be inspected in parallel
+INSPECT_WORKERS = 8
+# keep-alive connections to docker engine for short queries: all the workers may query the
+# engine at the same time, plus the thread processing realtime events
+DOCKER_CLIENT_POOL_SIZE = BACKGROUND_WORKERS + UI_WORKERS + INSPECT_WORKERS + 1
+# connections for long-lived streams (events, stats, logs) so they never occupy connections
+# for short queries; more streams are possible, connections beyond this are not kept alive
+DOCKER_STREAM_POOL_SIZE = 16
+
+# realtime events received within this window (seconds) are merged per object and applied at once
+EVENTS_COALESCE_WINDOW = 0.2
+# docker engine announces pause/unpause before the container changes its state: check it again
+# after this many seconds
+EVENTS_RECHECK_DELAY = 1.0
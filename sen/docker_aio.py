@@ -0,0 +1,251 @@
+"""
+Minimal asyncio client for docker engine API: HTTP/1.1 over a unix socket.
+
+Long-lived streams (events, stats, logs) are served by coroutines running in the event loop of
+the user interface, so they don't need a thread each.
+"""
+
+import asyncio
+import codecs
+import json
+import logging
+import struct
+from urllib.parse import urlencode, quote
+
+import docker.errors
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SOCKET_PATH = "/var/run/docker.sock"
+UNIX_SOCKET_PREFIXES = ("http+unix://", "unix://")
+# stdin, stdout, stderr
+LOG_FRAME_STREAM_TYPES = (0, 1, 2)
+LOG_FRAME_HEADER_SIZE = 8
+
+
+def get_unix_socket_path(base_url):
+    """
+    :param base_url: str, e.g. "unix:///var/run/docker.sock", None for default
+    :return: str, path to the socket or None if docker engine is not listening on a unix socket
+    """
+    if not base_url:
+        return DEFAULT_SOCKET_PATH
+    for prefix in UNIX_SOCKET_PREFIXES:
+        if base_url.startswith(prefix):
+            return base_url[len(prefix):]
+    return None
+
+
+def encode_params(params):
+    """
+    encode query parameters the same way docker-py does
+
+    :param params: dict
+    :return: str
+    """
+    encoded = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, dict):
+            value = json.dumps(value)
+        encoded[key] = value
+    return urlencode(encoded)
+
+
+def is_multiplexed(data):
+    """
+    logs of containers without TTY are sent in frames: 8 byte header + payload
+
+    :param data: bytes, beginning of the response
+    :return: bool
+    """
+    return len(data) >= LOG_FRAME_HEADER_SIZE and data[0] in LOG_FRAME_STREAM_TYPES and \
+        data[1:4] == b"\x00\x00\x00"
+
+
+class AsyncDockerClient:
+    """
+    every request opens its own connection: streams occupy it for their whole life anyway
+    """
+
+    def __init__(self, socket_path, api_version):
+        """
+        :param socket_path: str, path to unix socket where docker engine listens
+        :param api_version: str, e.g. "1.41"
+        """
+        self.socket_path = socket_path
+        self.api_version = api_version
+
+    async def _request(self, path, params=None, method="GET"):
+        """
+        send the request and read status line and headers of the response
+
+        :return: tuple (asyncio.StreamReader, asyncio.StreamWriter, dict with headers)
+        """
+        url = "/v{}{}".format(self.api_version, path)
+        query = encode_params(params)
+        if query:
+            url += "?" + query
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        request = "{} {} HTTP/1.1\r\nHost: docker\r\nUser-Agent: sen\r\n" \
+                  "Connection: close\r\n\r\n".format(method, url)
+        writer.write(request.encode("ascii"))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        try:
+            _, status, _ = status_line.decode("latin-1").split(" ", 2)
+            status = int(status)
+        except ValueError:
+            writer.close()
+            raise docker.errors.APIError("invalid response from docker engine: %r" % status_line)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if status >= 400:
+            body = b""
+            async for chunk in self._read_body(reader, headers):
+                body += chunk
+            writer.close()
+            message = "{} {}: {}".format(status, url, body.decode("utf-8", "replace").strip())
+            if status == 404:
+                raise docker.errors.NotFound(message)
+            raise docker.errors.APIError(message)
+        return reader, writer, headers
+
+    @staticmethod
+    async def _read_body(reader, headers):
+        """
+        async generator of chunks of response body
+        """
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await reader.readline()
+                if not size_line:
+                    return
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    return
+                chunk = await reader.readexactly(size)
+                await reader.readline()  # CRLF after every chunk
+                yield chunk
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length:
+                yield await reader.readexactly(length)
+        else:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                yield chunk
+
+    async def _open_stream(self, path, params=None):
+        """
+        send the request and return async generator of raw chunks of the response body
+        """
+        reader, writer, headers = await self._request(path, params=params)
+
+        async def read():
+            try:
+                async for chunk in self._read_body(reader, headers):
+                    yield chunk
+            finally:
+                writer.close()
+        return read()
+
+    async def _stream(self, path, params=None):
+        """
+        async generator of raw chunks of the response body
+        """
+        chunks = await self._open_stream(path, params=params)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    @staticmethod
+    async def _decode_json_stream(chunks):
+        """
+        async generator of decoded JSON objects sent one after another
+        """
+        decoder = json.JSONDecoder()
+        # a multi-byte character may be split between two chunks
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        buf = ""
+        try:
+            async for chunk in chunks:
+                buf += text_decoder.decode(chunk)
+                while True:
+                    buf = buf.lstrip()
+                    if not buf:
+                        break
+                    try:
+                        obj, index = decoder.raw_decode(buf)
+                    except ValueError:
+                        # incomplete object, wait for more data
+                        break
+                    buf = buf[index:]
+                    yield obj
+        finally:
+            await chunks.aclose()
+
+    # API
+
+    async def events(self, since=None, filters=None):
+        """
+        subscribe to events; connection errors are raised here, not while iterating
+
+        :return: async generator of events
+        """
+        params = {"since": since, "filters": filters}
+        return self._decode_json_stream(await self._open_stream("/events", params=params))
+
+    async def stats(self, container_id):
+        """
+        async generator of resource usage statistics of the container
+        """
+        path = "/containers/{}/stats".format(quote(container_id))
+        async for stats in self._decode_json_stream(self._stream(path, params={"stream": True})):
+            yield stats
+
+    async def logs(self, container_id, follow=False, tail="all"):
+        """
+        async generator of log chunks (bytes), same as docker-py provides them
+        """
+        path = "/containers/{}/logs".format(quote(container_id))
+        params = {"stdout": True, "stderr": True, "follow": follow, "tail": tail}
+        buf = b""
+        multiplexed = None
+        async for chunk in self._stream(path, params=params):
+            if multiplexed is False:
+                yield chunk
+                continue
+            buf += chunk
+            if multiplexed is None:
+                if len(buf) < LOG_FRAME_HEADER_SIZE:
+                    continue
+                multiplexed = is_multiplexed(buf)
+                if not multiplexed:
+                    yield buf
+                    buf = b""
+                    continue
+            while len(buf) >= LOG_FRAME_HEADER_SIZE:
+                _, length = struct.unpack(">BxxxL", buf[:LOG_FRAME_HEADER_SIZE])
+                if len(buf) < LOG_FRAME_HEADER_SIZE + length:
+                    break
+                yield buf[LOG_FRAME_HEADER_SIZE:LOG_FRAME_HEADER_SIZE + length]
+                buf = buf[LOG_FRAME_HEADER_SIZE + length:]
+        if buf and not multiplexed:
+            yield buf
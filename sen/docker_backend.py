@@ -1,11 +1,23 @@
+import asyncio
+import calendar
 import functools
 import json
 import logging
 import datetime
+import itertools
+import queue
+import re
+import threading
+import time
 import traceback
+from bisect import bisect_right
 from operator import attrgetter
 
-from sen.constants import ISO_DATETIME_PARSE_STRING
+from sen.constants import (
+    ISO_DATETIME_PARSE_STRING, INSPECT_WORKERS,
+    DOCKER_CLIENT_POOL_SIZE, DOCKER_STREAM_POOL_SIZE,
+    EVENTS_COALESCE_WINDOW, EVENTS_RECHECK_DELAY
+)
 from sen.exceptions import (
     TerminateApplication, NotifyError, NotAvailableAnymore
 )
@@ -13,12 +25,13 @@ from sen.exceptions import (
 import docker
 import docker.errors
 
+from sen.docker_aio import AsyncDockerClient, get_unix_socket_path
 from sen.net import NetData
 from sen.util import (
     calculate_cpu_percent, calculate_cpu_percent2, calculate_blkio_bytes,
     calculate_network_bytes, repeater,
     humanize_time,
-    graceful_chain_get
+    graceful_chain_get, log_last_traceback
 )
 
 logger = logging.getLogger(__name__)
@@ -26,6 +39,334 @@ logger = logging.getLogger(__name__)
 
 DINOSAUR_TIME = datetime.datetime.fromordinal(1)
 
+# what needs to be done with the object model when an event is received
+EVENT_IGNORE = "ignore"
+EVENT_REFRESH_CONTAINER = "refresh-container"
+EVENT_REMOVE_CONTAINER = "remove-container"
+EVENT_UPDATE_HEALTH = "update-health"
+EVENT_REFRESH_IMAGE = "refresh-image"
+EVENT_REMOVE_IMAGE = "remove-image"
+EVENT_RESYNC = "resync"
+# (Type, Action) -> what to do; (Type, None) applies to all actions of the type which are not
+# listed; events which are not matched cause full resync
+EVENT_MODEL_ACTIONS = {
+    ("container", "create"): EVENT_REFRESH_CONTAINER,
+    ("container", "start"): EVENT_REFRESH_CONTAINER,
+    ("container", "restart"): EVENT_REFRESH_CONTAINER,
+    ("container", "die"): EVENT_REFRESH_CONTAINER,
+    ("container", "stop"): EVENT_REFRESH_CONTAINER,
+    ("container", "pause"): EVENT_REFRESH_CONTAINER,
+    ("container", "unpause"): EVENT_REFRESH_CONTAINER,
+    ("container", "rename"): EVENT_REFRESH_CONTAINER,
+    ("container", "update"): EVENT_REFRESH_CONTAINER,
+    ("container", "destroy"): EVENT_REMOVE_CONTAINER,
+    ("container", "health_status"): EVENT_UPDATE_HEALTH,
+    # a new image was created, but the event doesn't tell us which one
+    ("container", "commit"): EVENT_RESYNC,
+    # "die" is sent right after these
+    ("container", "kill"): EVENT_IGNORE,
+    ("container", "oom"): EVENT_IGNORE,
+    # nothing we display changes; healthchecks run exec every few seconds
+    ("container", "exec_create"): EVENT_IGNORE,
+    ("container", "exec_start"): EVENT_IGNORE,
+    ("container", "exec_die"): EVENT_IGNORE,
+    ("container", "exec_detach"): EVENT_IGNORE,
+    ("container", "top"): EVENT_IGNORE,
+    ("container", "attach"): EVENT_IGNORE,
+    ("container", "detach"): EVENT_IGNORE,
+    ("container", "resize"): EVENT_IGNORE,
+    ("container", "copy"): EVENT_IGNORE,
+    ("container", "export"): EVENT_IGNORE,
+    ("container", "archive-path"): EVENT_IGNORE,
+    ("container", "extract-to-dir"): EVENT_IGNORE,
+    ("container", "mount"): EVENT_IGNORE,
+    ("container", "unmount"): EVENT_IGNORE,
+    ("image", "pull"): EVENT_REFRESH_IMAGE,
+    ("image", "tag"): EVENT_REFRESH_IMAGE,
+    ("image", "untag"): EVENT_REFRESH_IMAGE,
+    ("image", "import"): EVENT_REFRESH_IMAGE,
+    ("image", "load"): EVENT_REFRESH_IMAGE,
+    ("image", "build"): EVENT_REFRESH_IMAGE,
+    ("image", "delete"): EVENT_REMOVE_IMAGE,
+    ("image", "push"): EVENT_IGNORE,
+    ("image", "save"): EVENT_IGNORE,
+    # object model doesn't track these
+    ("network", None): EVENT_IGNORE,
+    ("volume", None): EVENT_IGNORE,
+    ("plugin", None): EVENT_IGNORE,
+    ("daemon", None): EVENT_IGNORE,
+    ("service", None): EVENT_IGNORE,
+    ("node", None): EVENT_IGNORE,
+    ("secret", None): EVENT_IGNORE,
+    ("config", None): EVENT_IGNORE,
+    ("builder", None): EVENT_IGNORE,
+}
+# "Up 2 minutes (healthy)", "Up 2 seconds (health: starting)"
+HEALTH_STATUS_REGEX = re.compile(r"\s*\((healthy|unhealthy|health: starting)\)$")
+# human readable status of a container as `containers()` provides it -> state
+CONTAINER_STATUS_PREFIXES = (
+    ("Up", "running"),
+    ("Exited", "exited"),
+    ("Created", "created"),
+    ("Restarting", "restarting"),
+    ("Removal In Progress", "removing"),
+    ("Dead", "dead"),
+)
+# states when inspect says that the container is running
+CONTAINER_RUNNING_STATES = {"running", "paused", "restarting"}
+# exit code follows the state, e.g. "Exited (137) 2 hours ago" or "Restarting (1) 3 seconds ago"
+EXIT_CODE_REGEX = re.compile(r"^[A-Za-z ]+\((-?\d+)\)")
+# priorities of inspect requests, lower number is processed sooner
+INSPECT_PRIORITY_HIGH = 0
+INSPECT_PRIORITY_NORMAL = 5
+INSPECT_PRIORITY_LOW = 10
+# action of a synthetic event which signals that the whole object model was loaded again
+RESYNC_EVENT_ACTION = "resync"
+# https://github.com/TomasTomecek/sen/issues/143
+# dockerd sends these events while the container is being paused, not when it's done
+RECHECK_EVENT_ACTIONS = {"pause", "unpause"}
+# set in events which were scheduled again by sen to check state of the object
+RECHECK_EVENT_KEY = "senRecheck"
+# these events have side effects besides changing the object itself
+UNMERGEABLE_EVENT_ACTIONS = {"commit"}
+
+
+def get_event_action(event):
+    """
+    action of the event without additional info, e.g. "exec_start: sh" -> "exec_start"
+
+    :param event: dict
+    :return: str
+    """
+    action = graceful_chain_get(event, "Action") or graceful_chain_get(event, "status") or ""
+    return action.split(":", 1)[0].strip()
+
+
+def get_event_object_type(event):
+    """
+    :param event: dict
+    :return: str, "container", "image", "network"... or None if we can't tell
+    """
+    try:
+        # 1.10+
+        return event["Type"]
+    except KeyError:
+        # event["from'] means it's a container
+        if "from" in event:
+            return "container"
+        if ("image", get_event_action(event)) in EVENT_MODEL_ACTIONS:
+            return "image"
+        return None
+
+
+def get_event_model_action(event):
+    """
+    look up what needs to be done with the object model when the event is received
+
+    :param event: dict
+    :return: str, EVENT_*
+    """
+    object_type = get_event_object_type(event)
+    for key in ((object_type, get_event_action(event)), (object_type, None)):
+        try:
+            return EVENT_MODEL_ACTIONS[key]
+        except KeyError:
+            pass
+    if object_type in ("container", "image", None):
+        # we can't tell what changed
+        return EVENT_RESYNC
+    logger.debug("object model doesn't track objects of type %r", object_type)
+    return EVENT_IGNORE
+
+
+def get_resync_event():
+    """
+    synthetic event which says that anything might have changed
+
+    :return: dict
+    """
+    return {"Type": "sen", "Action": RESYNC_EVENT_ACTION, "status": RESYNC_EVENT_ACTION}
+
+
+def get_event_object_id(event):
+    """
+    :param event: dict
+    :return: str, ID (or name) of the object the event is about, None if there's no such
+    """
+    return event.get("id") or graceful_chain_get(event, "Actor", "ID")
+
+
+def get_event_object_key(event):
+    """
+    events with the same key are about the same thing: only the last one of them matters
+
+    :param event: dict
+    :return: tuple
+    """
+    object_type = get_event_object_type(event)
+    action = get_event_action(event)
+    object_id = get_event_object_id(event)
+    if object_id is None or action in UNMERGEABLE_EVENT_ACTIONS:
+        return object_type, object_id, action
+    return object_type, object_id
+
+
+def coalesce_events(events):
+    """
+    merge events about the same object, the object model is refreshed from docker engine anyway;
+    events which don't change the model are dropped
+
+    :param events: list of dicts, ordered as received
+    :return: list of dicts, ordered by the last event of every object
+    """
+    merged = {}
+    for event in events:
+        if get_event_action(event) == RESYNC_EVENT_ACTION:
+            # everything was loaded from scratch
+            merged.clear()
+        elif get_event_model_action(event) == EVENT_IGNORE:
+            # they would hide events which change the model, e.g. "resize" sent after "start"
+            continue
+        key = get_event_object_key(event)
+        previous = merged.pop(key, None)
+        if previous is not None and \
+                get_event_model_action(event) == EVENT_UPDATE_HEALTH and \
+                get_event_model_action(previous) != EVENT_UPDATE_HEALTH:
+            # the object is refreshed anyway, which updates its health as well
+            event = previous
+        merged[key] = event
+    return list(merged.values())
+
+
+def get_event_filters(object_types):
+    """
+    filters for events subscription: docker engine sends only events which change the object
+    model of provided types
+
+    :param object_types: iterable of str, e.g. {"container", "image"}
+    :return: dict or None if there's nothing to subscribe to
+    """
+    if not object_types:
+        # engine would send everything
+        return None
+    actions = {action for (object_type, action), model_action in EVENT_MODEL_ACTIONS.items()
+               if object_type in object_types and action and model_action != EVENT_IGNORE}
+    return {"type": sorted(object_types), "event": sorted(actions)}
+
+
+def get_health_status(event):
+    """
+    :param event: dict, "health_status" event
+    :return: str, "healthy", "unhealthy" or "starting"
+    """
+    action = graceful_chain_get(event, "Action") or graceful_chain_get(event, "status") or ""
+    return action.split(":", 1)[-1].strip()
+
+
+def get_event_time_nano(event):
+    """
+    :param event: dict
+    :return: int, nanoseconds since epoch or None if the event doesn't say
+    """
+    time_nano = event.get("timeNano")
+    if time_nano is not None:
+        return int(time_nano)
+    time_sec = event.get("time")
+    if time_sec is not None:
+        return int(time_sec) * 10 ** 9
+    return None
+
+
+def get_recheck_events(events):
+    """
+    :param events: list of dicts, applied events
+    :return: list of dicts, events which should be processed again after a while
+    """
+    return [dict(event, **{RECHECK_EVENT_KEY: True}) for event in events
+            if get_event_action(event) in RECHECK_EVENT_ACTIONS and not event.get(RECHECK_EVENT_KEY)]
+
+
+def parse_docker_datetime(value):
+    """
+    parse datetime string as returned by docker, e.g. "2016-01-04T21:26:31.943198534Z"
+
+    :param value: str
+    :return: datetime.datetime (UTC) or DINOSAUR_TIME when the value can't be parsed
+    """
+    # python expects 6 digits in milliseconds, docker returns 9
+    value = value[:26]
+    if value == "0001-01-01T00:00:00Z":
+        return DINOSAUR_TIME
+    value = value.replace("Z", "0")
+    try:
+        return datetime.datetime.strptime(value, ISO_DATETIME_PARSE_STRING)
+    except ValueError as ex:
+        logger.error("unable to parse datetime %s: %s", value, ex)
+        return DINOSAUR_TIME
+
+
+def get_timestamp(value):
+    """
+    docker provides time either as a timestamp or as a datetime string, unify it
+
+    :param value: int, float or str
+    :return: int, timestamp in UTC, or None when the value is not set
+    """
+    if isinstance(value, (int, float)):
+        return value or None
+    if not value:
+        return None
+    parsed = parse_docker_datetime(value)
+    if parsed == DINOSAUR_TIME:
+        return None
+    return calendar.timegm(parsed.timetuple())
+
+
+def parse_container_status(status):
+    """
+    get state and exit code from the human readable status of a container,
+    e.g. "Exited (137) 2 hours ago" -> ("exited", 137), "Restarting (1) 3 seconds ago" ->
+    ("restarting", 1), "Up 2 hours (Paused)" -> ("paused", 0)
+
+    :param status: str
+    :return: tuple (str, int), (None, None) when the status can't be parsed; exit code is None
+             when the status doesn't contain it
+    """
+    if not status:
+        return None, None
+    for prefix, state in CONTAINER_STATUS_PREFIXES:
+        if status.startswith(prefix):
+            break
+    else:
+        return None, None
+    if state == "running" and status.endswith("(Paused)"):
+        state = "paused"
+    match = EXIT_CODE_REGEX.match(status)
+    if match:
+        return state, int(match.group(1))
+    if state in ("exited", "dead"):
+        return state, None
+    return state, 0
+
+
+def image_data_from_inspect(inspect_data):
+    """
+    turn response of `inspect_image` into data in the same shape as `images()` provides
+
+    :param inspect_data: dict
+    :return: dict
+    """
+    return {
+        "Id": inspect_data["Id"],
+        "ParentId": inspect_data.get("Parent", ""),
+        "Created": get_timestamp(inspect_data.get("Created")) or 0,
+        "RepoTags": inspect_data.get("RepoTags", None),
+        "RepoDigests": inspect_data.get("RepoDigests", None),
+        "Size": inspect_data.get("Size", 0),
+        "VirtualSize": inspect_data.get("VirtualSize", inspect_data.get("Size", 0)),
+        "Labels": graceful_chain_get(inspect_data, "Config", "Labels"),
+    }
+
 
 class ImageNameStruct(object):
     """
@@ -166,6 +507,13 @@ class DockerObject:
         """
         return self.docker_backend.client
 
+    @property
+    def stream_d(self):
+        """
+        shortcut for instance of Docker client dedicated to long-lived streams
+        """
+        return self.docker_backend.stream_client
+
     @property
     def created_int(self):
         return self.data["Created"]
@@ -210,6 +558,13 @@ class DockerObject:
     def inspect(self, cached=True):
         raise NotImplementedError()
 
+    @property
+    def is_inspected(self):
+        """
+        is inspect data loaded? metadata_get doesn't need to query docker engine then
+        """
+        return self._inspect is not None
+
     def display_inspect(self):
         try:
             return json.dumps(self.inspect().response, indent=2)
@@ -223,7 +578,19 @@ class DockerObject:
 
     @property
     def natural_sort_value(self):
-        return self.created
+        """
+        timestamp used to sort objects in listing, it's computed from listing data only: the
+        order doesn't change when the object is inspected
+        """
+        return self.created_int
+
+    @property
+    def precise_sort_value(self):
+        """
+        timestamp used to sort objects in listing when precise sorting was requested, it may
+        use inspect data
+        """
+        return self.natural_sort_value
 
     def metadata_get(self, path, cached=True):
         """
@@ -325,25 +692,10 @@ class DockerImage(DockerObject):
         return self.docker_backend.get_images_for_parent(self)
 
     def get_next_sibling(self):
-        imgs = self.parent_image.children
-        if len(imgs) == 1:
-            return None
-        try:
-            return imgs[imgs.index(self) + 1]
-        except IndexError:
-            return None
+        return self.docker_backend.get_image_sibling(self, 1)
 
     def get_prev_sibling(self):
-        imgs = self.parent_image.children
-        if len(imgs) == 1:
-            return None
-        # 0 - 1 turns into -1 which turns into last element which creates cycle
-        # which totally messes up whole tree
-        prev_index = imgs.index(self) - 1
-        if prev_index < 0:
-            return None
-        else:
-            return imgs[prev_index]
+        return self.docker_backend.get_image_sibling(self, -1)
 
     @property
     def command(self):
@@ -423,6 +775,21 @@ class DockerImage(DockerObject):
             self._names.sort(key=lambda x: len(x.to_str()))
         return self._names
 
+    def is_tagged(self):
+        """
+        does the image have a name or a digest? `docker images` displays only tagged images
+        and the untagged ones without any child
+        """
+        if not self.data:
+            return False
+        for t in self.data.get("RepoTags") or []:
+            if t != "<none>:<none>":
+                return True
+        for t in self.data.get("RepoDigests") or []:
+            if t != "<none>@<none>":
+                return True
+        return False
+
     @property
     def short_name(self):
         try:
@@ -524,6 +891,7 @@ class DockerContainer(DockerObject):
         super(DockerContainer, self).__init__(data, docker_backend, object_id)
         self.size_root_fs = None
         self.size_rw_fs = None
+        self._listing_state = None
 
     def __str__(self):
         return "{} ({})".format(self.container_id, self.short_name)
@@ -552,8 +920,30 @@ class DockerContainer(DockerObject):
     def nice_status(self):
         return self.data["Status"]
 
+    @property
+    def listing_state(self):
+        """
+        state and exit code of the container from `containers()` data so we don't need to
+        inspect every container in listing
+
+        :return: tuple (str, int), see parse_container_status
+        """
+        if self._listing_state is None:
+            state, exit_code = parse_container_status(graceful_chain_get(self.data, "Status"))
+            # docker >= 1.12 provides the state directly
+            listed_state = graceful_chain_get(self.data, "State")
+            if isinstance(listed_state, str) and listed_state:
+                state = listed_state
+                if state not in ("exited", "dead") and exit_code is None:
+                    exit_code = 0
+            self._listing_state = (state, exit_code)
+        return self._listing_state
+
     @property
     def simple_status(self):
+        state, _ = self.listing_state
+        if state:
+            return state
         return self.metadata_get(["State", "Status"])
 
     @property
@@ -562,6 +952,9 @@ class DockerContainer(DockerObject):
 
     @property
     def running(self):
+        state, _ = self.listing_state
+        if state:
+            return state in CONTAINER_RUNNING_STATES
         return self.metadata_get(["State", "Running"])
 
     @property
@@ -570,6 +963,9 @@ class DockerContainer(DockerObject):
 
     @property
     def exit_code(self):
+        _, exit_code = self.listing_state
+        if exit_code is not None:
+            return exit_code
         return self.metadata_get(["State", "ExitCode"])
 
     @property
@@ -627,45 +1023,51 @@ class DockerContainer(DockerObject):
     def started_at(self):
         s = self.metadata_get(["State", "StartedAt"])
         if s:
-            # python expects 6 digits in milliseconds, docker returns 9
-            s = s[:26]
-            if s == "0001-01-01T00:00:00Z":
-                return DINOSAUR_TIME
-            s = s.replace("Z", "0")
-            try:
-                started_at = datetime.datetime.strptime(s, ISO_DATETIME_PARSE_STRING)
-            except ValueError as ex:
-                logger.error("unable to parse datetime %s: %s", s, ex)
-                return DINOSAUR_TIME
-            return started_at
+            return parse_docker_datetime(s)
 
     @property
     def finished_at(self):
         f = self.metadata_get(["State", "FinishedAt"])
         if f:
-            f = f[:26]
-            if f == "0001-01-01T00:00:00Z":
-                return DINOSAUR_TIME
-            f = f.replace("Z", "0")
-            try:
-                finished_at = datetime.datetime.strptime(f, ISO_DATETIME_PARSE_STRING)
-            except ValueError as ex:
-                logger.error("unable to parse datetime %s: %s", f, ex)
-                return DINOSAUR_TIME
-            return finished_at
+            return parse_docker_datetime(f)
+
+    @property
+    def state_timestamps(self):
+        """
+        timestamps when the container was started and finished; these are taken from listing
+        data if the engine provides them (podman does) -- docker engine is never queried
+
+        :return: tuple (int or None, int or None)
+        """
+        started = graceful_chain_get(self.data, "StartedAt")
+        finished = graceful_chain_get(self.data, "FinishedAt") or \
+            graceful_chain_get(self.data, "ExitedAt")
+        return get_timestamp(started), get_timestamp(finished)
+
+    @property
+    def precise_state_timestamps(self):
+        """
+        same as state_timestamps but inspect data are used when listing data don't contain the
+        timestamps, see DockerBackend.load_precise_timestamps
+
+        :return: tuple (int or None, int or None)
+        """
+        started, finished = self.state_timestamps
+        if started is None and self._inspect:
+            started = get_timestamp(graceful_chain_get(self._inspect, "State", "StartedAt"))
+        if finished is None and self._inspect:
+            finished = get_timestamp(graceful_chain_get(self._inspect, "State", "FinishedAt"))
+        return started, finished
 
     @property
     def natural_sort_value(self):
-        # docker acts weird: 'created' is provided as ordinal and is local time
-        # 'started' and 'finished' are UTC as timestamp; it would be awesome to unite those b/c
-        # atm these inconsistencies mess ordering
-        try:
-            # Nones are unsortable
-            return max([x for x in
-                        [self.started_at, self.finished_at, super().natural_sort_value]
-                        if x])
-        except NotAvailableAnymore:
-            return super().natural_sort_value
+        # 'created' is provided as a timestamp while 'started' and 'finished' are UTC datetime
+        # strings: compare all of them as timestamps; Nones are unsortable
+        return max([self.created_int] + [x for x in self.state_timestamps if x])
+
+    @property
+    def precise_sort_value(self):
+        return max([self.created_int] + [x for x in self.precise_state_timestamps if x])
 
     # methods
 
@@ -682,32 +1084,25 @@ class DockerContainer(DockerObject):
 
     @operation("Get resources statistics.")
     def stats(self):
-        cpu_total = 0.0
-        cpu_system = 0.0
-        cpu_percent = 0.0
-        for x in self.d.stats(self.container_id, decode=True, stream=True):
-            blk_read, blk_write = calculate_blkio_bytes(x)
-            net_r, net_w = calculate_network_bytes(x)
-            mem_current = x["memory_stats"]["usage"]
-            mem_total = x["memory_stats"]["limit"]
+        calculator = StatsCalculator()
+        for x in self.stream_d.stats(self.container_id, decode=True, stream=True):
+            yield calculator.process(x)
 
-            try:
-                cpu_percent, cpu_system, cpu_total = calculate_cpu_percent2(x, cpu_total, cpu_system)
-            except KeyError as e:
-                logger.error("error while getting new CPU stats: %r, falling back")
-                cpu_percent = calculate_cpu_percent(x)
-
-            r = {
-                "cpu_percent": cpu_percent,
-                "mem_current": mem_current,
-                "mem_total": x["memory_stats"]["limit"],
-                "mem_percent": (mem_current / mem_total) * 100.0,
-                "blk_read": blk_read,
-                "blk_write": blk_write,
-                "net_rx": net_r,
-                "net_tx": net_w,
-            }
-            yield r
+    @operation("Get resources statistics.")
+    async def stats_async(self):
+        """
+        same as stats() but the stream is read in asyncio event loop
+        """
+        calculator = StatsCalculator()
+        async for x in self.docker_backend.aio_client.stats(self.container_id):
+            yield calculator.process(x)
+
+    @operation("Logs of container {object_short_name} received.")
+    def logs_async(self, follow=False, lines="all"):
+        """
+        async generator of logs, read in asyncio event loop
+        """
+        return self.docker_backend.aio_client.logs(self.container_id, follow=follow, tail=lines)
 
     @operation("List processes in running container.")
     def top(self):
@@ -743,8 +1138,9 @@ class DockerContainer(DockerObject):
     def logs(self, follow=False, lines="all"):
         # when tail is set to all, it takes ages to populate widget
         # docker-py does `inspect` in the background
+        client = self.stream_d if follow else self.d
         try:
-            logs_data = self.d.logs(self.container_id, stream=follow, tail=lines)
+            logs_data = client.logs(self.container_id, stream=follow, tail=lines)
         except docker.errors.NotFound:
             return None
         else:
@@ -779,6 +1175,323 @@ class DockerContainer(DockerObject):
         self.d.unpause(self.container_id)
 
 
+class StatsCalculator:
+    """
+    turn raw statistics from docker engine into numbers we display; CPU usage is computed
+    from a difference between two consecutive samples
+    """
+
+    def __init__(self):
+        self.cpu_total = 0.0
+        self.cpu_system = 0.0
+
+    def process(self, x):
+        blk_read, blk_write = calculate_blkio_bytes(x)
+        net_r, net_w = calculate_network_bytes(x)
+        mem_current = x["memory_stats"]["usage"]
+        mem_total = x["memory_stats"]["limit"]
+
+        try:
+            cpu_percent, self.cpu_system, self.cpu_total = calculate_cpu_percent2(
+                x, self.cpu_total, self.cpu_system)
+        except KeyError as e:
+            logger.error("error while getting new CPU stats: %r, falling back")
+            cpu_percent = calculate_cpu_percent(x)
+
+        return {
+            "cpu_percent": cpu_percent,
+            "mem_current": mem_current,
+            "mem_total": x["memory_stats"]["limit"],
+            "mem_percent": (mem_current / mem_total) * 100.0,
+            "blk_read": blk_read,
+            "blk_write": blk_write,
+            "net_rx": net_r,
+            "net_tx": net_w,
+        }
+
+
+class EventSubscriptions:
+    """
+    registry of subscribers interested in realtime events of specific objects or of all objects
+    of a type; subscribers of an event are looked up by type and ID of its object
+    """
+
+    def __init__(self, types_changed_callback=None):
+        """
+        :param types_changed_callback: callable, called with set of subscribed object types
+                                       whenever it changes
+        """
+        self.types_changed_callback = types_changed_callback
+        self._lock = threading.Lock()
+        # (object type, object ID or None for all objects of the type) -> {subscriber: None}
+        self._subscribers = {}
+        # subscriber -> set of keys
+        self._keys = {}
+
+    @property
+    def object_types(self):
+        with self._lock:
+            return {object_type for object_type, _ in self._subscribers}
+
+    def subscribe(self, subscriber, object_type, object_id=None):
+        """
+        :param subscriber: object with method process_realtime_events(events)
+        :param object_type: str, "container" or "image"
+        :param object_id: str, ID of the object, None means all objects of the type
+        """
+        key = (object_type, object_id)
+        with self._lock:
+            types_before = {t for t, _ in self._subscribers}
+            self._subscribers.setdefault(key, {})[subscriber] = None
+            self._keys.setdefault(subscriber, set()).add(key)
+        self._types_changed(types_before)
+
+    def unsubscribe(self, subscriber):
+        """
+        remove all subscriptions of the subscriber
+        """
+        with self._lock:
+            types_before = {t for t, _ in self._subscribers}
+            for key in self._keys.pop(subscriber, ()):
+                subscribers = self._subscribers[key]
+                subscribers.pop(subscriber, None)
+                if not subscribers:
+                    del self._subscribers[key]
+        self._types_changed(types_before)
+
+    def _types_changed(self, types_before):
+        object_types = self.object_types
+        if object_types != types_before and self.types_changed_callback:
+            self.types_changed_callback(object_types)
+
+    def route(self, events):
+        """
+        find subscribers of provided events
+
+        :param events: list of dicts
+        :return: dict, subscriber -> list of events, ordered as provided
+        """
+        routes = {}
+        with self._lock:
+            for event in events:
+                if get_event_action(event) == RESYNC_EVENT_ACTION:
+                    subscribers = list(self._keys)
+                else:
+                    object_type = get_event_object_type(event)
+                    subscribers = list(self._subscribers.get((object_type, None), ()))
+                    subscribers += self._subscribers.get(
+                        (object_type, get_event_object_id(event)), ())
+                for subscriber in dict.fromkeys(subscribers):
+                    routes.setdefault(subscriber, []).append(event)
+        return routes
+
+
+class EventsCursor:
+    """
+    position in the events stream: when the stream is opened again, docker engine replays
+    events since the last one we processed from its buffer
+
+    the buffer is limited, if the replay doesn't start with our last event, some events
+    were dropped and the object model needs to be loaded again
+    """
+
+    def __init__(self):
+        self.time_nano = None
+        # identities of processed events which happened at self.time_nano
+        self.seen = set()
+        # last processed event matches current filters, so it's going to be replayed
+        self.can_verify = False
+        self.verifying = False
+
+    @property
+    def since(self):
+        """
+        :return: str, value of `since` parameter of events query, None if nothing was processed
+        """
+        if self.time_nano is None:
+            return None
+        return "%d.%09d" % divmod(self.time_nano, 10 ** 9)
+
+    def filters_changed(self):
+        self.can_verify = False
+
+    def resume(self):
+        """
+        the stream was opened again, let's verify that replayed events continue from our position
+
+        :return: bool, False if we can't tell
+        """
+        self.verifying = self.can_verify and self.time_nano is not None
+        return self.verifying
+
+    def process(self, event):
+        """
+        :param event: dict
+        :return: tuple (bool whether event was already processed, bool whether we missed some)
+        """
+        time_nano = get_event_time_nano(event)
+        if time_nano is None:
+            # engine is too old to tell
+            return False, False
+        if self.time_nano is not None and time_nano < self.time_nano:
+            return True, False
+        key = json.dumps(event, sort_keys=True)
+        if time_nano == self.time_nano and key in self.seen:
+            self.verifying = False
+            return True, False
+        gap = self.verifying and time_nano > self.time_nano
+        self.verifying = False
+        if time_nano != self.time_nano:
+            self.time_nano = time_nano
+            self.seen = set()
+        self.seen.add(key)
+        self.can_verify = True
+        return False, gap
+
+
+class PrefetchBatch:
+    """
+    set of objects which are being inspected in the background
+    """
+
+    def __init__(self, objects, pending):
+        """
+        :param objects: list of DockerObject
+        :param pending: int, how many of the objects still need to be inspected
+        """
+        self.objects = objects
+        self._pending = pending
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._callbacks = []
+        if pending <= 0:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        block until all the objects are inspected
+
+        :param timeout: float, seconds
+        :return: bool, False if the timeout expired
+        """
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn):
+        """
+        call fn(batch) once all the objects are inspected; immediately if they already are
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def object_done(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending > 0:
+                return
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as ex:
+                logger.error("prefetch callback %s failed: %r", fn, ex)
+                log_last_traceback()
+
+
+class InspectRequest:
+    """
+    inspect of a single object requested by one or more batches
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.objects = []
+        self.batches = []
+        self.started = False
+
+
+class InspectPrefetcher:
+    """
+    inspect docker objects in parallel on a bounded pool of threads: requests are processed by
+    priority, an object is inspected only once even if it's requested by several batches
+    """
+
+    def __init__(self, workers=INSPECT_WORKERS):
+        self.workers = workers
+        self._queue = queue.PriorityQueue()
+        self._lock = threading.Lock()
+        self._requests = {}  # object ID -> InspectRequest
+        self._counter = itertools.count()  # FIFO for items with the same priority
+        self._threads = []
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def prefetch(self, objects, priority=INSPECT_PRIORITY_NORMAL, callback=None, refresh=False):
+        """
+        inspect provided objects in the background, the result is stored in the objects
+
+        :param objects: list of DockerObject
+        :param priority: int, INSPECT_PRIORITY_*
+        :param callback: function, called with the batch once all objects are inspected
+        :param refresh: bool, inspect even objects which were already inspected
+        :return: PrefetchBatch
+        """
+        to_fetch = [x for x in objects if refresh or x._inspect is None]
+        batch = PrefetchBatch(objects, len(to_fetch))
+        if callback:
+            batch.add_done_callback(callback)
+        if not to_fetch:
+            return batch
+        with self._lock:
+            self._start_workers()
+            for obj in to_fetch:
+                request = self._requests.get(obj.object_id)
+                if request is None:
+                    request = InspectRequest(priority)
+                    self._requests[obj.object_id] = request
+                    self._queue.put((priority, next(self._counter), obj.object_id))
+                elif priority < request.priority and not request.started:
+                    # the old queue item is skipped once the request is started
+                    request.priority = priority
+                    self._queue.put((priority, next(self._counter), obj.object_id))
+                request.objects.append(obj)
+                request.batches.append(batch)
+        return batch
+
+    def _work(self):
+        while True:
+            _, _, object_id = self._queue.get()
+            with self._lock:
+                request = self._requests.get(object_id)
+                if request is None or request.started:
+                    continue
+                request.started = True
+                obj = request.objects[0]
+            try:
+                inspect_data = obj.inspect(cached=False).response
+            except Exception as ex:
+                logger.error("unable to inspect %s: %r", obj, ex)
+                inspect_data = None
+            with self._lock:
+                del self._requests[object_id]
+            if inspect_data is not None:
+                # the same object may be represented by several instances
+                for o in request.objects:
+                    o._inspect = inspect_data
+            for batch in request.batches:
+                batch.object_done()
+
+
 class DockerBackend:
     """
     backend for docker
@@ -786,56 +1499,105 @@ class DockerBackend:
 
     def __init__(self):
         self._containers = None
+        # image ID -> {container ID: container}
+        self._image_containers = {}
         self._images = None  # displayed images
         self._all_images = None  # docker images -a
+        # parent image ID -> list of child images sorted by creation, "" is scratch
+        self._image_children = {}
+        # image ID -> position of the image in the list of its parent's children
+        self._image_positions = {}
         self._df = None
 
+        # realtime events modify the model from a different thread than the one which reads it
+        self._model_lock = threading.RLock()
+
+        # types of objects buffers subscribed to: docker engine filters events for us
+        self._event_types = frozenset()
+        # events of some types were not received, so the model is outdated
+        self._event_types_resync = False
+        # stops reading of current events stream so it can be opened with new filters
+        self._interrupt_events = None
+        self._subscription_lock = threading.Lock()
+        # buffers subscribe here to events of objects they display
+        self.subscriptions = EventSubscriptions(self.set_event_types)
+
         kwargs = {"version": "auto"}
         kwargs.update(docker.utils.kwargs_from_env())
 
+        try:
+            self.client = self._create_client(kwargs, DOCKER_CLIENT_POOL_SIZE)
+            # streams hold their connection for a long time: they have their own pool
+            kwargs["version"] = self.client.api_version
+            self.stream_client = self._create_client(kwargs, DOCKER_STREAM_POOL_SIZE)
+        except docker.errors.DockerException as ex:
+            raise TerminateApplication("can't establish connection to docker daemon: {0}".format(str(ex)))
+
+        # streams can be read natively in asyncio event loop, only unix socket is supported
+        socket_path = get_unix_socket_path(kwargs.get("base_url"))
+        if socket_path:
+            self.aio_client = AsyncDockerClient(socket_path, self.client.api_version)
+        else:
+            logger.info("docker engine doesn't listen on unix socket, streams are read in threads")
+            self.aio_client = None
+
+        self.scratch_image = RootImage(self)
+
+        self.prefetcher = InspectPrefetcher()
+
+    @staticmethod
+    def _create_client(kwargs, pool_size):
         try:
             APIClientClass = docker.Client  # 1.x
         except AttributeError:
             APIClientClass = docker.APIClient  # 2.x
 
         try:
-            self.client = APIClientClass(**kwargs)
-        except docker.errors.DockerException as ex:
-            raise TerminateApplication("can't establish connection to docker daemon: {0}".format(str(ex)))
-
-        self.scratch_image = RootImage(self)
+            return APIClientClass(max_pool_size=pool_size, **kwargs)
+        except TypeError:
+            # docker-py < 4.2 doesn't allow to size the pool
+            logger.info("unable to set size of connection pool")
+            return APIClientClass(**kwargs)
 
     # backend queries
 
     @operation("Get list of images.")
     def get_images(self, cached=True):
-        if cached is False or self._images is None:
-            logger.debug("doing images() query")
-            self._images = {}
-            images_response = repeater(self.client.images) or []
-            for i in images_response:
-                img = DockerImage(i, self)
-                self._images[img.image_id] = img
-            self._all_images = {}
-            # FIXME: performance: do just all=True
-            all_images_response = repeater(self.client.images, kwargs={"all": True}) or []
-            for i in all_images_response:
-                img = DockerImage(i, self)
-                self._all_images[img.image_id] = img
-        return list(self._images.values())
+        with self._model_lock:
+            if cached is False or self._images is None:
+                logger.debug("doing images() query")
+                self._all_images = {}
+                all_images_response = repeater(self.client.images, kwargs={"all": True}) or []
+                for i in all_images_response:
+                    img = DockerImage(i, self)
+                    self._all_images[img.image_id] = img
+                self._image_children = {}
+                self._image_positions = {}
+                for img in sorted(self._all_images.values(), key=attrgetter("created_int")):
+                    self._image_children.setdefault(img.parent_id or "", []).append(img)
+                for children in self._image_children.values():
+                    self._update_image_positions(children)
+                # same as `docker images` without `-a`: skip untagged images with children
+                self._images = {}
+                for img in self._all_images.values():
+                    if img.is_tagged() or img.image_id not in self._image_children:
+                        self._images[img.image_id] = img
+            return list(self._images.values())
 
     @operation("Get list of containers.")
     def get_containers(self, cached=True, stopped=True):
-        if cached is False or self._containers is None:
-            logger.debug("doing containers() query")
-            self._containers = {}
-            containers_response = repeater(self.client.containers, kwargs={"all": stopped}) or []
-            for c in containers_response:
-                container = DockerContainer(c, self)
-                self._containers[container.container_id] = container
+        with self._model_lock:
+            if cached is False or self._containers is None:
+                logger.debug("doing containers() query")
+                self._containers = {}
+                self._image_containers = {}
+                containers_response = repeater(self.client.containers, kwargs={"all": stopped}) or []
+                for c in containers_response:
+                    self._add_container(DockerContainer(c, self))
+            containers = list(self._containers.values())
         if not stopped:
-            return [x for x in list(self._containers.values()) if x.running]
-        return list(self._containers.values())
+            return [x for x in containers if x.running]
+        return containers
 
     @operation("Get disk usage.")
     def df(self, cached=True):
@@ -861,63 +1623,536 @@ class DockerBackend:
                 i._virtual_size = graceful_chain_get(i_data, "VirtualSize")
         return self._df
 
+    def set_event_types(self, object_types):
+        """
+        subscribe to events of provided types only; the events stream is opened again if the
+        set changed
+
+        :param object_types: iterable of str, e.g. {"container", "image"}
+        """
+        object_types = frozenset(object_types)
+        with self._subscription_lock:
+            if object_types == self._event_types:
+                return
+            logger.info("subscribing to events of %s", sorted(object_types))
+            if object_types - self._event_types and self._containers is not None:
+                # the model was loaded and we didn't receive events of these objects since
+                self._event_types_resync = True
+            self._event_types = object_types
+            interrupt = self._interrupt_events
+        if interrupt:
+            interrupt()
+
+    def _get_subscription(self, interrupt):
+        """
+        :param interrupt: callable which stops reading of current events stream
+        :return: tuple (filters, bool whether the model needs to be loaded again)
+        """
+        with self._subscription_lock:
+            self._interrupt_events = interrupt
+            resync, self._event_types_resync = self._event_types_resync, False
+            return get_event_filters(self._event_types), resync
+
     def realtime_updates(self):
-        event = it = None
+        """
+        generator of raw events from docker engine, see realtime_batches(); only events of
+        objects someone subscribed to are received
+
+        when the stream has to be opened again, it continues from the last received event; if
+        some events were dropped from the buffer of docker engine meanwhile, the model is
+        loaded from scratch and a synthetic "resync" event is yielded
+        """
+        changed = threading.Event()
+        cursor = EventsCursor()
+        it = None
+
+        def interrupt():
+            changed.set()
+            if it is not None:
+                it.close()
+
+        reconnecting = False
         while True:
-            if not it or not event:
-                it = repeater(self.client.events, kwargs={"decode": True}, retries=5)
+            changed.clear()
+            filters, resync = self._get_subscription(interrupt)
+            if filters is None:
+                logger.info("no buffer is interested in realtime events")
+                cursor.filters_changed()
+                changed.wait()
+                continue
+            kwargs = {"decode": True, "filters": filters, "since": cursor.since}
+            try:
+                it = self.stream_client.events(**kwargs)
+            except Exception as ex:
+                logger.info("unable to read events from docker engine: %r", ex)
+                # engine was likely restarted and lost its buffer of events
+                resync = resync or reconnecting
+                it = repeater(self.stream_client.events, kwargs=kwargs, retries=5)
                 if not it:
                     raise NotifyError("Unable to fetch realtime updates from docker engine.")
+            if changed.is_set():
+                # subscription changed while we were connecting
+                it.close()
+            if reconnecting and not cursor.resume():
+                resync = True
+            if resync:
+                logger.info("events stream was reopened, we might have missed some events")
+                self.resync()
+                yield get_resync_event()
+
+            while True:
+                try:
+                    event = next(it)
+                except StopIteration:
+                    break
+                except Exception as ex:
+                    logger.info("events stream broke: %r", ex)
+                    break
+                processed, gap = cursor.process(event)
+                if processed:
+                    continue
+                if gap:
+                    logger.info("docker engine dropped some events while we were reconnecting")
+                    self.resync()
+                    yield get_resync_event()
+                    continue
+                logger.debug("RT event: %s", event)
+                yield event
+            it = None
+            # the stream was either closed by us to subscribe again, or it broke
+            reconnecting = not changed.is_set()
+            if not reconnecting:
+                cursor.filters_changed()
+
+    def realtime_batches(self, window=EVENTS_COALESCE_WINDOW):
+        """
+        generator of lists of events; events received within `window` seconds are merged per
+        object and the object model is updated before the list is yielded, so consumers
+        may work with cached data
+
+        :param window: float, seconds
+        """
+        q = queue.Queue()
+
+        def read_events():
+            try:
+                for e in self.realtime_updates():
+                    q.put(e)
+            except Exception as ex:
+                q.put(ex)
+        threading.Thread(target=read_events, daemon=True).start()
+
+        while True:
+            events = [q.get()]
+            deadline = time.monotonic() + window
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    events.append(q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            errors = [e for e in events if isinstance(e, Exception)]
+            batch = self.apply_events([e for e in events if not isinstance(e, Exception)])
+            for event in get_recheck_events(batch):
+                threading.Timer(EVENTS_RECHECK_DELAY, q.put, args=(event, )).start()
+            if batch:
+                yield batch
+            if errors:
+                raise errors[0]
+
+    async def realtime_updates_async(self):
+        """
+        same as realtime_updates() but the events stream is read in asyncio event loop
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        cursor = EventsCursor()
+
+        def interrupt():
+            loop.call_soon_threadsafe(changed.set)
+
+        reconnecting = False
+        while True:
+            changed.clear()
+            filters, resync = self._get_subscription(interrupt)
+            if filters is None:
+                logger.info("no buffer is interested in realtime events")
+                cursor.filters_changed()
+                await changed.wait()
+                continue
+            for attempt in range(5):
+                try:
+                    it = await self.aio_client.events(filters=filters, since=cursor.since)
+                    break
+                except (OSError, docker.errors.APIError) as ex:
+                    logger.info("unable to read events from docker engine: %r", ex)
+                    # engine was likely restarted and lost its buffer of events
+                    resync = resync or reconnecting
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+            else:
+                raise NotifyError("Unable to fetch realtime updates from docker engine.")
+
+            if reconnecting and not cursor.resume():
+                resync = True
+            if resync:
+                logger.info("events stream was reopened, we might have missed some events")
+                await loop.run_in_executor(None, self.resync)
+                yield get_resync_event()
+
+            changed_task = loop.create_task(changed.wait())
+            try:
+                while True:
+                    next_task = loop.create_task(it.__anext__())
+                    await asyncio.wait({next_task, changed_task},
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    if not next_task.done():
+                        # subscription changed
+                        next_task.cancel()
+                        await asyncio.gather(next_task, return_exceptions=True)
+                        break
+                    event = next_task.result()
+                    processed, gap = cursor.process(event)
+                    if processed:
+                        continue
+                    if gap:
+                        logger.info("docker engine dropped some events while we were reconnecting")
+                        await loop.run_in_executor(None, self.resync)
+                        yield get_resync_event()
+                        continue
+                    logger.debug("RT event: %s", event)
+                    yield event
+            except StopAsyncIteration:
+                logger.info("events stream was closed by docker engine")
+            except (OSError, docker.errors.APIError) as ex:
+                logger.info("events stream broke: %r", ex)
+            finally:
+                changed_task.cancel()
+                await it.aclose()
+            # the stream was either closed by us to subscribe again, or it broke
+            reconnecting = not changed.is_set()
+            if not reconnecting:
+                cursor.filters_changed()
+
+    async def realtime_batches_async(self, window=EVENTS_COALESCE_WINDOW):
+        """
+        same as realtime_batches() but the events are received in asyncio event loop;
+        the object model is still updated in a thread since it performs blocking queries
+
+        :param window: float, seconds
+        """
+        loop = asyncio.get_running_loop()
+        q = asyncio.Queue()
+
+        async def read_events():
+            try:
+                async for e in self.realtime_updates_async():
+                    q.put_nowait(e)
+            except Exception as ex:
+                q.put_nowait(ex)
+        reader = loop.create_task(read_events())
 
-            event = repeater(next, args=(it, ), retries=2)  # likely an engine restart
-            if not event:
+        try:
+            while True:
+                events = [await q.get()]
+                deadline = loop.time() + window
+                while True:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        events.append(await asyncio.wait_for(q.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                errors = [e for e in events if isinstance(e, Exception)]
+                batch = await loop.run_in_executor(
+                    None, self.apply_events, [e for e in events if not isinstance(e, Exception)])
+                for event in get_recheck_events(batch):
+                    loop.call_later(EVENTS_RECHECK_DELAY, q.put_nowait, event)
+                if batch:
+                    yield batch
+                if errors:
+                    raise errors[0]
+        finally:
+            reader.cancel()
+
+    def apply_events(self, events):
+        """
+        merge events per object and update the object model according to them
+
+        :param events: list of dicts, ordered as received
+        :return: list of dicts, merged events which changed the model
+        """
+        batch = []
+        for event in coalesce_events(events):
+            if get_event_action(event) == RESYNC_EVENT_ACTION:
+                # the model was already loaded again when the stream was reopened
+                pass
+            elif get_event_model_action(event) == EVENT_IGNORE:
+                # buffers don't need to know either
                 continue
+            else:
+                self._apply_event_or_resync(event)
+            batch.append(event)
+        return batch
 
-            logger.debug("RT event: %s", event)
-
-            yield event
-
-            # try:
-            #     # 1.10+
-            #     is_container = event["Type"] == "container"
-            # except KeyError:
-            #     # event["from'] means it's a container
-            #     is_container = "from" in event
-            # if is_container:
-            #     # inspect doesn't contain info about status and you can't query just one
-            #     # container with containers()
-            #     # let's do full-blown containers() query; it's not that expensive
-            #     self.get_containers(cached=False)
-            # else:
-            #     # similar as ^
-            #     # images() doesn't support query by ID
-            #     # inspect doesn't contain info about repositories
-            #     self.get_images(cached=False)
-            # content, _, _ = self.filter(containers=True, images=True, stopped=True,
-            #                             cached=True, sort_by_created=True)
-            # yield content
+    def _apply_event_or_resync(self, event):
+        try:
+            self.apply_event(event)
+        except Exception as ex:
+            logger.error("unable to apply event %s, doing full resync: %r", event, ex)
+            self.resync()
+
+    # incremental updates of the object model
+
+    def resync(self):
+        """
+        throw away the object model and load it again from docker engine
+        """
+        logger.info("loading containers and images from scratch")
+        with self._model_lock:
+            self.get_containers(cached=False)
+            self.get_images(cached=False)
+
+    def apply_event(self, event):
+        """
+        update containers and images in place according to the provided event: only the
+        affected object is queried; unknown events cause full resync
+
+        :param event: dict, event as returned by docker engine
+        :return: None
+        """
+        model_action = get_event_model_action(event)
+        if model_action == EVENT_IGNORE:
+            return
+        object_id = get_event_object_id(event)
+
+        with self._model_lock:
+            if self._containers is None or self._all_images is None:
+                logger.debug("object model is not loaded yet, ignoring event")
+                return
+            if model_action == EVENT_REFRESH_CONTAINER:
+                self._refresh_container(object_id)
+            elif model_action == EVENT_REMOVE_CONTAINER:
+                self._remove_container(object_id)
+            elif model_action == EVENT_UPDATE_HEALTH:
+                self._update_container_health(object_id, get_health_status(event))
+            elif model_action == EVENT_REFRESH_IMAGE:
+                self._refresh_image(object_id)
+            elif model_action == EVENT_REMOVE_IMAGE:
+                self._remove_image(object_id)
+            else:
+                logger.info("event %s, doing full resync", event)
+                self.resync()
+
+    def _refresh_container(self, container_id):
+        response = repeater(self.client.containers,
+                            kwargs={"all": True, "filters": {"id": container_id}})
+        if response is None:
+            raise RuntimeError("unable to get container %s" % container_id)
+        if not response:
+            self._remove_container(container_id)
+            return
+        self._add_container(DockerContainer(response[0], self))
+
+    def _update_container_health(self, container_id, health):
+        """
+        healthchecks don't change anything else, there's no need to query docker engine
+        """
+        container = self._containers.get(container_id, None)
+        if container is None:
+            self._refresh_container(container_id)
+            return
+        status = HEALTH_STATUS_REGEX.sub("", container.data["Status"])
+        health_suffix = "health: starting" if health == "starting" else health
+        new_container = DockerContainer(
+            dict(container.data, Status="{} ({})".format(status, health_suffix)), self)
+        if container._inspect:
+            inspect_data = dict(container._inspect)
+            state = dict(inspect_data.get("State", {}))
+            state["Health"] = dict(state.get("Health") or {}, Status=health)
+            inspect_data["State"] = state
+            new_container._inspect = inspect_data
+        self._add_container(new_container)
+
+    def _add_container(self, container):
+        self._remove_container(container.container_id)
+        self._containers[container.container_id] = container
+        self._image_containers.setdefault(container.image_id, {})[container.container_id] = container
+
+    def _remove_container(self, container_id):
+        container = self._containers.pop(container_id, None)
+        if container is None:
+            return
+        image_containers = self._image_containers.get(container.image_id, {})
+        image_containers.pop(container_id, None)
+        if not image_containers:
+            self._image_containers.pop(container.image_id, None)
+
+    def _refresh_image(self, image_ref):
+        """
+        :param image_ref: str, ID or name of the image
+        """
+        try:
+            inspect_data = self.client.inspect_image(image_ref)
+        except docker.errors.NotFound:
+            self._remove_image(image_ref)
+            return
+        image = DockerImage(image_data_from_inspect(inspect_data), self)
+        image._inspect = inspect_data
+        # tags are unique: an image tagged with a new name steals the name from others
+        for name in image.data["RepoTags"] or []:
+            for other in list(self._all_images.values()):
+                if other != image and name in (other.data.get("RepoTags") or []):
+                    data = dict(other.data)
+                    data["RepoTags"] = [t for t in data["RepoTags"] if t != name]
+                    self._add_image(DockerImage(data, self))
+        self._add_image(image)
+
+    def _add_image(self, image):
+        old_image = self._all_images.get(image.image_id)
+        if old_image is not None:
+            self._unindex_image(old_image)
+        self._all_images[image.image_id] = image
+        self._index_image(image)
+        self._update_top_level_image(image)
+        parent = self._all_images.get(image.parent_id)
+        if parent is not None:
+            self._update_top_level_image(parent)
+
+    def _remove_image(self, image_id):
+        image = self._all_images.pop(image_id, None)
+        self._images.pop(image_id, None)
+        if image is not None:
+            self._unindex_image(image)
+            parent = self._all_images.get(image.parent_id)
+            if parent is not None:
+                self._update_top_level_image(parent)
+
+    def _update_top_level_image(self, image):
+        """
+        put the image in (or remove it from) displayed images: these are all the images which
+        `docker images` lists: tagged images and images without children
+        """
+        if image.is_tagged() or image.image_id not in self._image_children:
+            self._images[image.image_id] = image
+        else:
+            self._images.pop(image.image_id, None)
+
+    def _index_image(self, image):
+        siblings = self._image_children.setdefault(image.parent_id or "", [])
+        index = bisect_right([x.created_int for x in siblings], image.created_int)
+        siblings.insert(index, image)
+        self._update_image_positions(siblings, start=index)
+
+    def _unindex_image(self, image):
+        parent_id = image.parent_id or ""
+        index = self._image_positions.pop(image.image_id, None)
+        siblings = self._image_children.get(parent_id)
+        if index is None or not siblings:
+            return
+        del siblings[index]
+        if siblings:
+            self._update_image_positions(siblings, start=index)
+        else:
+            del self._image_children[parent_id]
+
+    def _update_image_positions(self, siblings, start=0):
+        for index in range(start, len(siblings)):
+            self._image_positions[siblings[index].image_id] = index
 
     # service methods
 
     def get_image_by_id(self, image_id):
+        if self._all_images is None:
+            return None
         return self._all_images.get(image_id)
 
     def get_images_for_parent(self, image):
+        """
+        child images of the provided image sorted by creation; don't modify the list
+
+        :param image: DockerImage
+        :return: list of DockerImage
+        """
         if not image:
             return []
-        l = sorted([x for x in self._all_images.values() if x.parent_image == image], key=lambda x: x.created_int)
-        return l
+        return self._image_children.get(image.image_id, [])
+
+    def get_image_sibling(self, image, offset):
+        """
+        get sibling of the provided image in the tree of images
+
+        :param image: DockerImage
+        :param offset: int, 1 for the next sibling, -1 for the previous one
+        :return: DockerImage or None
+        """
+        with self._model_lock:
+            try:
+                index = self._image_positions[image.image_id] + offset
+            except KeyError:
+                return None
+            siblings = self._image_children.get(image.parent_id or "", [])
+            # don't let negative index wrap around: it creates cycles in the tree
+            if 0 <= index < len(siblings):
+                return siblings[index]
+        return None
 
     def get_container_by_id(self, container_id):
+        if self._containers is None:
+            return None
         return self._containers.get(container_id)
 
     def get_containers_for_image(self, image_id):
-        return [container for container in self._containers.values() if container.image_id == image_id]
+        with self._model_lock:
+            return list(self._image_containers.get(image_id, {}).values())
 
-    def filter(self, containers=True, images=True, stopped=True, cached=False, sort_by_created=True):
+    def load_precise_timestamps(self, containers):
+        """
+        inspect provided containers (unless their inspect data is already loaded) so
+        DockerContainer.precise_sort_value reflects when they were started and finished
+
+        :param containers: list of DockerContainer
+        :return: None
+        """
+        self.prefetcher.prefetch(containers, priority=INSPECT_PRIORITY_HIGH).wait()
+
+    def prefetch_inspect(self, object_ids, priority=INSPECT_PRIORITY_NORMAL, callback=None,
+                         wait=False, refresh=False):
+        """
+        inspect containers and images in parallel; results are available via
+        DockerObject.inspect(cached=True) or DockerObject.metadata_get without querying docker
+
+        :param object_ids: list of str, IDs of containers or images
+        :param priority: int, INSPECT_PRIORITY_*
+        :param callback: function, called with PrefetchBatch once all objects are inspected
+        :param wait: bool, block until all the objects are inspected
+        :param refresh: bool, inspect even objects which were already inspected
+        :return: PrefetchBatch
+        """
+        objects = []
+        for object_id in object_ids:
+            obj = self.get_container_by_id(object_id) or self.get_image_by_id(object_id)
+            if obj is None:
+                logger.info("object %s is not known, won't inspect it", object_id)
+                continue
+            objects.append(obj)
+        batch = self.prefetcher.prefetch(objects, priority=priority, callback=callback,
+                                         refresh=refresh)
+        if wait:
+            batch.wait()
+        return batch
+
+    def filter(self, containers=True, images=True, stopped=True, cached=False, sort_by_created=True,
+               precise_sort=False):
         """
         since django is so awesome, let's use their ORM API
 
+        :param precise_sort: bool, sort containers also by the time they were started and
+                             finished; this requires inspecting containers
         :return:
         """
         content = []
@@ -927,9 +2162,12 @@ class DockerBackend:
         if containers or not stopped:
             containers_o = self.get_containers(cached=cached, stopped=stopped)
             content += containers_o.response
+            if sort_by_created and precise_sort:
+                self.load_precise_timestamps(containers_o.response)
         if images:
             images_o = self.get_images(cached=cached)
             content += images_o.response
         if sort_by_created:
-            content.sort(key=attrgetter("natural_sort_value"), reverse=True)
+            sort_key = "precise_sort_value" if precise_sort else "natural_sort_value"
+            content.sort(key=attrgetter(sort_key), reverse=True)
         return content, containers_o, images_o
@@ -1,8 +1,11 @@
 import logging
+import threading
+import time
 
-from sen.docker_backend import DockerContainer, RootImage
+from sen.docker_backend import DockerContainer, RootImage, get_resync_event
 from sen.exceptions import NotifyError
 from sen.tui.commands.base import Command
+from sen.tui.scheduler import CancellationToken
 from sen.tui.views.disk_usage import DfBufferView
 from sen.tui.views.help import HelpBufferView, HelpCommandView
 from sen.tui.views.main import MainListBox
@@ -24,6 +27,14 @@ class Buffer:
     description = None  # for help
     display_name = None  # display in status bar
     widget = None  # display this in main frame
+    # registry where the buffer subscribed to realtime events
+    subscriptions = None
+    # hidden buffers don't process events, they are refreshed once displayed again
+    displayed = False
+    stale = False
+    # buffers which were hidden for a long time stop streams and free their widgets
+    hidden_at = None
+    hibernating = False
 
     # global keybinds which will be available in every buffer
     global_keybinds = {
@@ -57,16 +68,41 @@ class Buffer:
     # buffer specific keybinds
     keybinds = {}
 
-    def __init__(self):
+    def __init__(self, subscriptions=()):
+        """
+        :param subscriptions: list of tuples (docker_backend, object_type, object_id), receive
+               realtime events of these objects; object_id None means all objects of the type
+        """
         logger.debug("creating buffer %r", self)
         self._keybinds = None  # cache
-        self.refresh()
+        self._display_lock = threading.Lock()
+        self._hibernate_lock = threading.RLock()
+        # cancelled once the buffer is destroyed: its queued tasks are dropped
+        self.tasks_token = CancellationToken()
+        # subscribe before the content is loaded so no change is missed
+        for docker_backend, object_type, object_id in subscriptions:
+            self.subscribe_realtime_events(docker_backend, object_type, object_id)
+        try:
+            self.refresh()
+        except Exception:
+            self.destroy()
+            raise
 
     def __repr__(self):
         return "{}(name={!r}, widget={!r})".format(
             self.__class__.__name__, self.display_name, self.widget)
 
+    def subscribe_realtime_events(self, docker_backend, object_type, object_id=None):
+        """
+        receive realtime events of the object, or of all objects of the type if ID is not set
+        """
+        self.subscriptions = docker_backend.subscriptions
+        self.subscriptions.subscribe(self, object_type, object_id)
+
     def destroy(self):
+        self.tasks_token.cancel()
+        if self.subscriptions is not None:
+            self.subscriptions.unsubscribe(self)
         destroy_method = getattr(self.widget, "destroy", None)
         if destroy_method:
             destroy_method()
@@ -109,10 +145,71 @@ class Buffer:
             logger.info("refreshing widget %s", self.widget)
             refresh_func()
 
+    def show(self):
+        """
+        buffer is being displayed: catch up with events received while it was hidden
+        """
+        with self._display_lock:
+            self.displayed = True
+            stale, self.stale = self.stale, False
+            hibernating, self.hibernating = self.hibernating, False
+        if hibernating:
+            logger.info("waking up buffer %s", self)
+            with self._hibernate_lock:
+                self.resume()
+        elif stale:
+            logger.info("buffer %s was changed while hidden, refreshing", self)
+            self.apply_realtime_events([get_resync_event()])
+
+    def hide(self):
+        with self._display_lock:
+            self.displayed = False
+            self.hidden_at = time.monotonic()
+
+    def hibernate(self):
+        """
+        buffer was not displayed for a long time: stop background streams and free widgets,
+        everything is loaded again once it's displayed
+        """
+        with self._hibernate_lock:
+            with self._display_lock:
+                if self.displayed or self.hibernating:
+                    return
+                self.hibernating = True
+            logger.info("buffer %s goes to hibernation", self)
+            self.suspend()
+
+    def suspend(self):
+        """
+        stop background streams and free widgets, buffers override this
+        """
+
+    def resume(self):
+        """
+        counterpart of suspend(): load everything again
+        """
+
     def process_realtime_event(self, event):
         logger.info("buffer %s doesn't process realtime events", self)
         return
 
+    def process_realtime_events(self, events):
+        """
+        process a batch of events, there is at most one event for every docker object; hidden
+        buffer is only marked stale
+
+        :param events: list of dicts
+        """
+        with self._display_lock:
+            if not self.displayed:
+                self.stale = True
+                return
+        self.apply_realtime_events(events)
+
+    def apply_realtime_events(self, events):
+        for event in events:
+            self.process_realtime_event(event)
+
 
 class ImageInfoBuffer(Buffer):
     description = "Dashboard for information about selected image.\n" + \
@@ -137,11 +234,10 @@ class ImageInfoBuffer(Buffer):
         self.docker_image = docker_image
         self.display_name = docker_image.short_name
         self.widget = ImageInfoWidget(ui, docker_image)
-        super().__init__()
+        super().__init__([(docker_image.docker_backend, "image", docker_image.object_id)])
 
     def process_realtime_event(self, event):
-        if event.get("id", None) == self.docker_image.object_id:
-            self.widget.refresh()
+        self.widget.refresh()
 
 
 class ContainerInfoBuffer(Buffer):
@@ -160,14 +256,17 @@ class ContainerInfoBuffer(Buffer):
         self.docker_container = docker_container
         self.display_name = docker_container.short_name
         self.widget = ContainerInfoView(ui, docker_container)
-        super().__init__()
+        super().__init__([(docker_container.docker_backend, "container",
+                           docker_container.object_id)])
 
     def process_realtime_event(self, event):
-        action = event.get("Action", None)
-        if action == "top":
-            return
-        if event.get("id", None) == self.docker_container.object_id:
-            self.widget.refresh()
+        self.widget.refresh()
+
+    def suspend(self):
+        self.widget.suspend()
+
+    def resume(self):
+        self.widget.refresh()
 
 
 class TreeBuffer(Buffer):
@@ -206,10 +305,13 @@ class MainListBuffer(Buffer):
     def __init__(self, ui, docker_backend):
         self.ui = ui
         self.widget = MainListBox(ui, docker_backend)
-        super().__init__()
+        super().__init__([(docker_backend, "container", None), (docker_backend, "image", None)])
 
     def process_realtime_event(self, event):
-        self.widget.process_realtime_event(event)
+        self.widget.process_realtime_events([event])
+
+    def apply_realtime_events(self, events):
+        self.widget.process_realtime_events(events)
 
 
 class LogsBuffer(Buffer):
@@ -223,14 +325,15 @@ class LogsBuffer(Buffer):
         :param ui: ui object so we can refresh
         """
         self.display_name += "({})".format(docker_object.short_name)
+        self.docker_object = docker_object
+        self.ui = ui
+        self.follow = follow
         if isinstance(docker_object, DockerContainer):
             try:
                 pre_message = "Getting logs for container {}...".format(docker_object.short_name)
                 ui.notify_message(pre_message)
                 if follow:
-                    # FIXME: this is a bit race-y -- we might lose some logs with this approach
-                    operation = docker_object.logs(follow=follow, lines=0)
-                    static_data = docker_object.logs(follow=False).response
+                    operation, static_data = self._get_logs()
                     self.widget = AsyncScrollableListBox(operation.response, ui, static_data=static_data)
                 else:
                     operation = docker_object.logs(follow=follow)
@@ -245,6 +348,35 @@ class LogsBuffer(Buffer):
             raise NotifyError("Only containers have logs.")
         super().__init__()
 
+    def _get_logs(self):
+        """
+        :return: tuple (operation with stream of new logs, logs which are already there)
+        """
+        # FIXME: this is a bit race-y -- we might lose some logs with this approach
+        if self.docker_object.docker_backend.aio_client:
+            operation = self.docker_object.logs_async(follow=True, lines=0)
+        else:
+            operation = self.docker_object.logs(follow=True, lines=0)
+        static_data = self.docker_object.logs(follow=False).response
+        return operation, static_data
+
+    def suspend(self):
+        if self.follow:
+            self.widget.suspend()
+        else:
+            self.widget.set_text("")
+
+    def resume(self):
+        try:
+            if self.follow:
+                operation, static_data = self._get_logs()
+                self.widget.start(operation.response, static_data=static_data)
+            else:
+                self.widget.set_text(self.docker_object.logs(follow=False).response)
+        except Exception as ex:
+            self.ui.notify_message("Error getting logs for container %s: %r" % (self.docker_object, ex),
+                                   level="error")
+
 
 class InspectBuffer(Buffer):
     display_name = "Inspect "
@@ -260,18 +392,24 @@ class InspectBuffer(Buffer):
         self.ui = ui
         self.widget = None
         self.display_name += docker_object.short_name
-        super().__init__()
+        object_type = "container" if isinstance(docker_object, DockerContainer) else "image"
+        super().__init__([(docker_object.docker_backend, object_type, docker_object.object_id)])
 
     def refresh(self):
         inspect_data = self.docker_object.display_inspect()
         self.widget = ScrollableListBox(self.ui, inspect_data)
 
     def process_realtime_event(self, event):
-        if event.get("id", None) == self.docker_object.object_id:
-            self.ui.notify_message("Docker object changed, refreshing.")
-            focus = self.widget.get_focus()[1]
-            self.widget.set_text(self.docker_object.display_inspect())
-            self.widget.set_focus(focus)
+        self.ui.notify_message("Docker object changed, refreshing.")
+        focus = self.widget.get_focus()[1]
+        self.widget.set_text(self.docker_object.display_inspect())
+        self.widget.set_focus(focus)
+
+    def suspend(self):
+        self.widget.set_text("")
+
+    def resume(self):
+        self.widget.set_text(self.docker_object.display_inspect())
 
 
 class HelpBuffer(Buffer):
@@ -7,6 +7,7 @@ import logging
 from sen.util import humanize_bytes
 
 from sen.docker_backend import RootImage
+from sen.tui.constants import DEFERRED_CELL_PLACEHOLDER
 from sen.tui.widgets.list.util import get_time_attr_map
 from sen.tui.widgets.util import SelectableText, get_map
 
@@ -30,20 +31,24 @@ class LayerWidget(SelectableText):
 
 
 def get_detailed_image_row(docker_image):
+    """
+    command and base image are expensive to get: when the image is not inspected yet, their
+    cells contain a placeholder and should be filled via fill_deferred_image_cells once the
+    image is inspected
+    """
     row = []
     image_id = SelectableText(docker_image.short_id, maps=get_map())
     row.append(image_id)
 
-    command = SelectableText(docker_image.command, maps=get_map(default="main_list_ddg"))
+    command = SelectableText(DEFERRED_CELL_PLACEHOLDER, maps=get_map(default="main_list_ddg"))
     row.append(command)
 
-    base_image = docker_image.base_image()
-    base_image_text = ""
-    if base_image:
-        base_image_text = base_image.short_name
-    base_image_w = SelectableText(base_image_text, maps=get_map())
+    base_image_w = SelectableText(DEFERRED_CELL_PLACEHOLDER, maps=get_map())
     row.append(base_image_w)
 
+    if docker_image.is_inspected:
+        fill_deferred_image_cells(row, docker_image)
+
     time = SelectableText(docker_image.display_time_created(),
                           maps=get_time_attr_map(docker_image.created))
     row.append(time)
@@ -59,6 +64,22 @@ def get_detailed_image_row(docker_image):
     return row
 
 
+def fill_deferred_image_cells(row, docker_image):
+    """
+    populate cells of a row created by get_detailed_image_row which need inspect data
+
+    :param row: list of widgets
+    :param docker_image: DockerImage
+    """
+    row[1].text = docker_image.command
+
+    base_image = docker_image.base_image()
+    base_image_text = ""
+    if base_image:
+        base_image_text = base_image.short_name
+    row[2].text = base_image_text
+
+
 def get_image_names_markup(docker_image):
     text_markup = []
     for n in docker_image.names:
@@ -6,7 +6,7 @@ import logging
 
 from sen.docker_backend import DockerImage, DockerContainer
 from sen.tui.chunks.container import get_detailed_container_row
-from sen.tui.chunks.image import get_detailed_image_row
+from sen.tui.chunks.image import get_detailed_image_row, fill_deferred_image_cells
 
 
 logger = logging.getLogger(__name__)
@@ -19,3 +19,18 @@ def get_row(docker_object):
         return get_detailed_container_row(docker_object)
     else:
         raise Exception("what ")
+
+
+def has_deferred_cells(docker_object):
+    """
+    does the row returned by get_row contain cells which need inspect data?
+    """
+    return isinstance(docker_object, DockerImage) and not docker_object.is_inspected
+
+
+def fill_deferred_cells(row, docker_object):
+    """
+    populate cells of the row which need inspect data; the object should be inspected already
+    """
+    if isinstance(docker_object, DockerImage):
+        fill_deferred_image_cells(row, docker_object)
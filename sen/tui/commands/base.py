@@ -7,6 +7,7 @@ This could be also split into two parts: generic framework part, application spe
 import logging
 import shlex
 
+from sen.tui.scheduler import TASK_PRIORITY_NORMAL
 
 logger = logging.getLogger(__name__)
 
@@ -184,6 +185,10 @@ class Command:
     post_info_message = ""
     # how long it takes to run the command - in which queue it should be executed
     priority = None
+    # position in the queue, TASK_PRIORITY_*
+    task_priority = TASK_PRIORITY_NORMAL
+    # newer invocation in the same buffer replaces the queued one
+    coalescing = False
     # used in help message
     description = ""
     # define options
@@ -9,10 +9,11 @@ import urwid
 from sen.exceptions import NotifyError
 from sen.tui.buffer import HelpBuffer, TreeBuffer
 from sen.tui.commands.base import (
-    register_command, SameThreadCommand,
+    register_command, SameThreadCommand, BackendCommand,
     Option, Argument,
     NoSuchCommand
 )
+from sen.tui.scheduler import TASK_PRIORITY_HIGH
 from sen.util import log_traceback, log_last_traceback
 
 
@@ -233,10 +234,13 @@ In main listing, you may specify more precise query with these space-separated f
 * t[ype]=c[ontainer[s]]
 * t[ype]=i[mage[s]]
 * s[tate]=r[unning])
+* o[rder]=p[recise] - order containers also by the time they were started and finished,
+  this inspects all of them
 
 Examples
 * "type=container" - show only containers (short equivalent is "t=c")
-* "type=image fedora" - show images with string "fedora" in name (equivalent "t=i fedora")\
+* "type=image fedora" - show images with string "fedora" in name (equivalent "t=i fedora")
+* "t=c o=p" - show containers, the ones started or stopped recently first\
 """
 
     arguments_definitions = [
@@ -249,12 +253,14 @@ Examples
 
 
 @register_command
-class RefreshCurrentBufferCommand(SameThreadCommand):
+class RefreshCurrentBufferCommand(BackendCommand):
     name = "refresh"
     description = "Refresh current buffer."
+    task_priority = TASK_PRIORITY_HIGH
+    coalescing = True
 
     def run(self):
-        self.ui.current_buffer.refresh()
+        self.buffer.refresh()
 
 
 @register_command
@@ -64,4 +64,18 @@ PALETTE = [
 ]
 
 STATUS_BAR_REFRESH_SECONDS = 5
+# how many built rows of the main listing are kept; rows are built only when displayed
+LAZY_WALKER_CACHE_SIZE = 256
+# displayed in a cell which is being loaded in the background
+DEFERRED_CELL_PLACEHOLDER = "..."
+# a line of the main listing whose inspect failed requests it again after this many seconds
+INSPECT_RETRY_SECONDS = 5
 CLEAR_NOTIF_BAR_MESSAGE_IN = 5
+# screen is drawn at most this many times per second, no matter how often it's changed
+REDRAW_MAX_FPS = 20
+# buffers which were not displayed for this many seconds stop their streams and free widgets
+BUFFER_HIBERNATE_AFTER = 300
+# size of the screen which keeps frames in memory (sen.tui.headless), columns and rows
+HEADLESS_SCREEN_SIZE = (120, 40)
+# how long does the headless driver wait for the screen to display what it expects
+HEADLESS_TIMEOUT = 10.0
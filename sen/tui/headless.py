@@ -0,0 +1,177 @@
+"""
+User interface without a terminal: frames are kept in memory and keys are fed by a script.
+
+This is meant for tests and benchmarks of rendering and input latency, e.g.:
+
+    async def script(driver):
+        await driver.wait_for_text("Listing")
+        await driver.press("down", "down", "enter")
+
+    driver = HeadlessDriver(Application(docker_backend=backend, screen=HeadlessScreen()))
+    driver.run(script)
+    print(driver.latencies)
+"""
+
+import asyncio
+import functools
+import logging
+import time
+
+import urwid
+
+from sen.tui.constants import HEADLESS_SCREEN_SIZE, HEADLESS_TIMEOUT
+
+
+logger = logging.getLogger(__name__)
+
+
+# how often is the screen checked while waiting for a frame
+POLL_INTERVAL = 0.01
+
+
+class Frame:
+    def __init__(self, drawn_at, size, lines):
+        """
+        :param drawn_at: float, time.monotonic() when the frame was drawn
+        :param size: tuple, (columns, rows)
+        :param lines: list of str
+        """
+        self.drawn_at = drawn_at
+        self.size = size
+        self.lines = lines
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __repr__(self):
+        return "Frame(drawn_at={!r}, size={!r})".format(self.drawn_at, self.size)
+
+
+class HeadlessScreen(urwid.display.BaseScreen):
+    """
+    screen of a fixed size which keeps drawn frames in memory instead of drawing them to
+    a terminal; input is fed via feed()
+    """
+
+    def __init__(self, size=HEADLESS_SCREEN_SIZE):
+        """
+        :param size: tuple, (columns, rows)
+        """
+        super().__init__()
+        self.size = size
+        self.frames = []
+        self._event_loop = None
+        self._input_callback = None
+
+    def get_cols_rows(self):
+        return self.size
+
+    def draw_screen(self, size, canvas):
+        lines = [x.decode("utf-8") for x in canvas.text]
+        self.frames.append(Frame(time.monotonic(), size, lines))
+
+    def hook_event_loop(self, event_loop, callback):
+        self._event_loop = event_loop
+        self._input_callback = callback
+
+    def unhook_event_loop(self, event_loop):
+        self._event_loop = None
+        self._input_callback = None
+
+    def get_input_descriptors(self):
+        return []
+
+    def feed(self, keys):
+        """
+        pass keys to the application as if they were typed; call this from the thread of
+        the user interface
+
+        :param keys: list of str, e.g. ["down", "enter"]
+        """
+        if self._input_callback is None:
+            raise RuntimeError("screen is not used by a running main loop")
+        # input is processed in an alarm so urwid draws the screen afterwards
+        self._event_loop.alarm(0, functools.partial(self._input_callback, keys, []))
+
+
+class HeadlessDriver:
+    """
+    run application which uses HeadlessScreen and control it with a script: a coroutine
+    function which is run in the event loop of the user interface and accepts the driver
+    """
+
+    def __init__(self, app, timeout=HEADLESS_TIMEOUT):
+        """
+        :param app: instance of sen.tui.init.Application
+        :param timeout: float, seconds to wait for the screen to display what's expected
+        """
+        self.app = app
+        self.screen = app.loop.screen
+        self.timeout = timeout
+        # seconds between feeding a key and drawing the next frame
+        self.latencies = []
+
+    @property
+    def frames(self):
+        return self.screen.frames
+
+    @property
+    def text(self):
+        """
+        text of the last frame, empty string if nothing was drawn yet
+        """
+        if not self.frames:
+            return ""
+        return self.frames[-1].text
+
+    async def wait_for(self, predicate, timeout=None):
+        """
+        wait until text of the last frame satisfies the predicate
+
+        :param predicate: callable, accepts str
+        :param timeout: float, seconds, raise TimeoutError after that
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while not (self.frames and predicate(self.text)):
+            if time.monotonic() > deadline:
+                raise TimeoutError("screen didn't display what was expected; last frame:\n%s"
+                                   % self.text)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def wait_for_text(self, text, timeout=None):
+        await self.wait_for(lambda x: text in x, timeout=timeout)
+
+    async def press(self, *keys):
+        """
+        feed keys one by one, every key waits for the frame it causes
+        """
+        for key in keys:
+            frames_count = len(self.frames)
+            pressed_at = time.monotonic()
+            self.screen.feed([key])
+            await self.wait_for(lambda _: len(self.frames) > frames_count)
+            self.latencies.append(self.frames[frames_count].drawn_at - pressed_at)
+
+    def run(self, script):
+        """
+        run the application until the script finishes; an exception raised by the script is
+        raised here once the application quits
+
+        :param script: coroutine function, accepts this driver
+        """
+        failures = []
+
+        async def run_script():
+            try:
+                await script(self)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.error("headless script failed: %r", ex)
+                failures.append(ex)
+            finally:
+                self.app.ui.quit()
+
+        self.app.ui.run_coroutine(run_script())
+        self.app.run()
+        if failures:
+            raise failures[0]
@@ -5,6 +5,7 @@ Application specific code.
 import logging
 import threading
 
+from sen.constants import EVENTS_COALESCE_WINDOW
 from sen.exceptions import NotifyError
 from sen.tui.commands.base import Commander, SameThreadPriority
 from sen.tui.commands.display import DisplayListingCommand
@@ -17,17 +18,28 @@ logger = logging.getLogger(__name__)
 
 
 class Application:
-    def __init__(self, yolo=False):
-        self.d = DockerBackend()
+    def __init__(self, yolo=False, events_window=EVENTS_COALESCE_WINDOW, docker_backend=None,
+                 screen=None):
+        """
+        :param docker_backend: instance of DockerBackend, a new one is created by default
+        :param screen: instance of urwid screen, terminal is used by default
+        """
+        self.d = docker_backend or DockerBackend()
 
-        self.loop, self.ui = get_app_in_loop(PALETTE)
+        self.loop, self.ui = get_app_in_loop(PALETTE, screen=screen)
 
         self.ui.yolo = yolo
 
         self.ui.commander = Commander(self.ui, self.d)
 
-        self.rt_thread = threading.Thread(target=self.realtime_updates, daemon=True)
-        self.rt_thread.start()
+        # events of the same object received within this window are processed at once
+        self.events_window = events_window
+        if self.d.aio_client:
+            self.rt_thread = None
+            self.ui.run_coroutine(self.realtime_updates_async())
+        else:
+            self.rt_thread = threading.Thread(target=self.realtime_updates, daemon=True)
+            self.rt_thread.start()
 
     def run(self):
         self.ui.run_command(DisplayListingCommand.name, queue=SameThreadPriority())
@@ -41,20 +53,40 @@ class Application:
         """
         # TODO: make this available for every buffer
         logger.info("starting receiving events from docker")
-        it = self.d.realtime_updates()
+        it = self.d.realtime_batches(window=self.events_window)
         while True:
             try:
-                event = next(it)
+                events = next(it)
             except NotifyError as ex:
                 self.ui.notify_message("error when receiving realtime events from docker: %s" % ex,
                                        level="error")
                 return
-            # FIXME: we should pass events to all buffers
-            # ATM the buffers can't be rendered since they are not displayed
-            # and hence traceback like this: ListBoxError("Listbox contents too short! ...
-            logger.debug("pass event to current buffer %s", self.ui.current_buffer)
-            try:
-                self.ui.current_buffer.process_realtime_event(event)
-            except Exception as ex:
-                # swallow any exc
-                logger.error("error while processing runtime event: %r", ex)
+            self.process_realtime_events(events)
+
+    async def realtime_updates_async(self):
+        """
+        same as realtime_updates() but the events are received in the event loop of the UI;
+        buffers still process them in worker threads since they may query docker engine
+
+        :return: None
+        """
+        logger.info("starting receiving events from docker")
+        try:
+            async for events in self.d.realtime_batches_async(window=self.events_window):
+                self.process_realtime_events(events)
+        except NotifyError as ex:
+            self.ui.notify_message("error when receiving realtime events from docker: %s" % ex,
+                                   level="error")
+
+    def process_realtime_events(self, events):
+        """
+        pass events to buffers which subscribed to them, displayed or not; every buffer
+        processes them in the background, a newer batch replaces the one which is still queued:
+        buffers refresh from the model of the backend, which is already up to date
+
+        :param events: list of dicts
+        """
+        for buffer, buffer_events in self.d.subscriptions.route(events).items():
+            logger.debug("pass %d events to buffer %s", len(buffer_events), buffer)
+            self.ui.run_in_background(buffer.process_realtime_events, buffer_events,
+                                      key=("realtime-events", buffer), token=buffer.tasks_token)
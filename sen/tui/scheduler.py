@@ -0,0 +1,205 @@
+"""
+Background tasks of the user interface: a pool of threads which runs tasks by priority.
+
+A task may carry a coalescing key -- a newer task with the same key replaces the queued one --
+and a cancellation token, so a buffer can drop its pending work once it's destroyed.
+
+urwid is not thread safe: widgets are changed only in the thread of the user interface, other
+threads queue the changes and the event loop runs them.
+"""
+import functools
+import itertools
+import logging
+import queue
+import threading
+
+from sen.util import log_traceback
+
+
+logger = logging.getLogger(__name__)
+
+
+TASK_PRIORITY_HIGH = 0
+TASK_PRIORITY_NORMAL = 5
+TASK_PRIORITY_LOW = 10
+
+
+class CancellationToken:
+    """
+    shared by tasks which should be cancelled together; long-running tasks may check it
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class Task:
+    def __init__(self, func, args, kwargs, priority, key=None, token=None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.token = token
+        self._cancelled = False
+
+    def __repr__(self):
+        return "Task({!r}, priority={!r}, key={!r})".format(self.func, self.priority, self.key)
+
+    def cancel(self):
+        """
+        the task won't be started; it's not interrupted if it's running already
+        """
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled or (self.token is not None and self.token.cancelled)
+
+
+class TaskScheduler:
+    """
+    threads are started lazily, once there is something to do
+    """
+
+    def __init__(self, workers, name="worker"):
+        self.workers = workers
+        self.name = name
+        self._queue = queue.PriorityQueue()
+        self._lock = threading.Lock()
+        self._pending = {}  # coalescing key -> queued Task
+        self._counter = itertools.count()  # FIFO for tasks with the same priority
+        self._threads = []
+        self._shutdown = False
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, daemon=True,
+                                 name="{}-{}".format(self.name, len(self._threads)))
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, func, *args, priority=TASK_PRIORITY_NORMAL, key=None, token=None,
+               **kwargs):
+        """
+        queue func(*args, **kwargs)
+
+        :param priority: int, TASK_PRIORITY_*, lower number runs first
+        :param key: hashable, queued task with the same key is cancelled and replaced
+        :param token: CancellationToken, task is not started if the token is cancelled
+        :return: Task, or None if the scheduler is shut down
+        """
+        task = Task(func, args, kwargs, priority, key=key, token=token)
+        with self._lock:
+            if self._shutdown:
+                logger.info("scheduler %s is shut down, not running %s", self.name, task)
+                return None
+            if key is not None:
+                previous = self._pending.get(key)
+                if previous is not None:
+                    logger.debug("%s replaces queued %s", task, previous)
+                    previous.cancel()
+                self._pending[key] = task
+            self._start_workers()
+            self._queue.put((priority, next(self._counter), task))
+        return task
+
+    def shutdown(self):
+        """
+        drop queued tasks and stop the threads once they finish their current task
+        """
+        with self._lock:
+            self._shutdown = True
+            for task in self._pending.values():
+                task.cancel()
+            self._pending.clear()
+            for _ in self._threads:
+                # sentinels go after everything queued
+                self._queue.put((float("inf"), next(self._counter), None))
+
+    def _work(self):
+        while True:
+            _, _, task = self._queue.get()
+            if task is None:
+                return
+            with self._lock:
+                if self._shutdown:
+                    continue
+                if task.key is not None and self._pending.get(task.key) is task:
+                    del self._pending[task.key]
+            if task.cancelled:
+                logger.debug("skipping cancelled %s", task)
+                continue
+            log_traceback(task.func)(*task.args, **task.kwargs)
+
+
+class UIThreadDispatcher:
+    """
+    thread-safe queue of calls drained by the asyncio event loop of the user interface; until
+    the dispatcher is attached to a loop, calls are run right away
+    """
+
+    def __init__(self):
+        self.aio_loop = None
+        self.thread_id = None
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._drain_scheduled = False
+
+    def attach(self, aio_loop):
+        """
+        run queued calls in the provided loop; call this from the thread which runs the loop
+        """
+        self.aio_loop = aio_loop
+        self.thread_id = threading.get_ident()
+
+    def in_ui_thread(self):
+        return self.aio_loop is None or threading.get_ident() == self.thread_id
+
+    def call(self, func, *args, **kwargs):
+        """
+        run func in the thread of the user interface
+
+        :return: return value of func if called from that thread, None otherwise
+        """
+        if self.in_ui_thread():
+            return func(*args, **kwargs)
+        self._queue.put((func, args, kwargs))
+        with self._lock:
+            if self._drain_scheduled:
+                return None
+            self._drain_scheduled = True
+        try:
+            self.aio_loop.call_soon_threadsafe(self.drain)
+        except RuntimeError as ex:
+            # loop is closed, the application is quitting
+            logger.info("can't run %r in the thread of the user interface: %r", func, ex)
+        return None
+
+    def drain(self):
+        with self._lock:
+            self._drain_scheduled = False
+        while True:
+            try:
+                func, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            log_traceback(func)(*args, **kwargs)
+
+
+def ui_thread(method):
+    """
+    decorated method changes widgets: it's run by the dispatcher of the instance, so when it's
+    called from a worker thread, it's only queued and None is returned
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.dispatcher.call(method, self, *args, **kwargs)
+    return wrapper
@@ -3,18 +3,24 @@ This is a framework for terminal interfaces built on top of urwid.Frame.
 
 It must NOT contain any application specific code.
 """
+import asyncio
 import logging
-import threading
-from concurrent.futures.thread import ThreadPoolExecutor
+import time
 
 import urwid
 
+from sen.constants import BACKGROUND_WORKERS, UI_WORKERS
 from sen.exceptions import NotifyError
 from sen.tui.commands.base import (
     FrontendPriority, BackendPriority,
     SameThreadPriority, KeyNotMapped
 )
-from sen.tui.constants import CLEAR_NOTIF_BAR_MESSAGE_IN
+from sen.tui.constants import (
+    CLEAR_NOTIF_BAR_MESSAGE_IN, BUFFER_HIBERNATE_AFTER, REDRAW_MAX_FPS
+)
+from sen.tui.scheduler import (
+    TaskScheduler, UIThreadDispatcher, ui_thread, TASK_PRIORITY_HIGH, TASK_PRIORITY_LOW
+)
 from sen.tui.widgets.util import ThreadSafeFrame
 from sen.util import log_traceback, OrderedSet
 
@@ -25,23 +31,48 @@ logger = logging.getLogger(__name__)
 class ConcurrencyMixin:
     def __init__(self):
         # worker for long-running tasks - requests
-        self.worker = ThreadPoolExecutor(max_workers=4)
+        self.worker = TaskScheduler(BACKGROUND_WORKERS, name="background")
         # worker for quick ui operations
-        self.ui_worker = ThreadPoolExecutor(max_workers=2)
-
-    @staticmethod
-    def _run(worker, f, *args, **kwargs):
-        # TODO: do another wrapper to wrap notify exceptions and show them
-        f = log_traceback(f)
-        worker.submit(f, *args, **kwargs)
+        self.ui_worker = TaskScheduler(UI_WORKERS, name="ui")
+        # asyncio event loop which drives the user interface, coroutines run there
+        self.aio_loop = None
+        # widgets are changed only in the thread of the user interface
+        self.dispatcher = UIThreadDispatcher()
 
     def run_in_background(self, task, *args, **kwargs):
+        """
+        keyword arguments priority, key and token are passed to TaskScheduler.submit
+
+        :return: scheduler.Task
+        """
         logger.info("running task %r(%s, %s) in background", task, args, kwargs)
-        self._run(self.worker, task, *args, **kwargs)
+        return self.worker.submit(task, *args, **kwargs)
 
     def run_quickly_in_background(self, task, *args, **kwargs):
         logger.info("running a quick task %r(%s, %s) in background", task, args, kwargs)
-        self._run(self.ui_worker, task, *args, **kwargs)
+        return self.ui_worker.submit(task, *args, **kwargs)
+
+    def run_in_ui_thread(self, task, *args, **kwargs):
+        """
+        run the task in the thread of the user interface: right away if called from there,
+        queued otherwise
+        """
+        return self.dispatcher.call(task, *args, **kwargs)
+
+    def run_coroutine(self, coro):
+        """
+        schedule coroutine in the event loop of the user interface; safe to call from any thread
+
+        :return: concurrent.futures.Future, cancel it to stop the coroutine
+        """
+        logger.info("running coroutine %r in event loop", coro)
+        future = asyncio.run_coroutine_threadsafe(coro, self.aio_loop)
+
+        def log_exception(f):
+            if not f.cancelled() and f.exception() is not None:
+                logger.error("coroutine %r failed: %r", coro, f.exception())
+        future.add_done_callback(log_exception)
+        return future
 
 
 class UI(ThreadSafeFrame, ConcurrencyMixin):
@@ -50,8 +81,8 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
     """
 
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
         ConcurrencyMixin.__init__(self)
+        super().__init__(*args, **kwargs)
 
         # widget -> message or None
         self.widget_message_dict = {}
@@ -60,12 +91,6 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
         self.status_bar = None
         self.prompt_bar = None
 
-        # lock when managing notifications:
-        #  * when accessing self.notification_*
-        #  * when accessing widgets
-        # and most importantly, remember, locking is voodoo
-        self.notifications_lock = threading.RLock()
-
         # populated when loop and UI are instantiated
         self.loop = None
         self.commander = None
@@ -80,17 +105,19 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
     def refresh(self):
         self.loop.refresh()
 
+    @ui_thread
     def quit(self):
         """
         This could be called from another thread, so let's do this via alarm
         """
         def q(*args):
             raise urwid.ExitMainLoop()
-        self.worker.shutdown(wait=False)
-        self.ui_worker.shutdown(wait=False)
+        self.worker.shutdown()
+        self.ui_worker.shutdown()
         self.loop.set_alarm_in(0, q)
 
     # FIXME: move these to separate mixin
+    @ui_thread
     def _set_main_widget(self, widget, redraw):
         """
         add provided widget to widget list and display it
@@ -104,6 +131,7 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
             logger.debug("redraw main widget")
             self.refresh()
 
+    @ui_thread
     def display_buffer(self, buffer, redraw=True):
         """
         display provided buffer
@@ -113,9 +141,32 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
         """
         logger.debug("display buffer %r", buffer)
         self.buffer_movement_history.append(buffer)
+        if self.current_buffer is not None and self.current_buffer is not buffer:
+            self.current_buffer.hide()
+            self._schedule_hibernation(self.current_buffer)
         self.current_buffer = buffer
         self._set_main_widget(buffer.widget, redraw=redraw)
+        # buffer might have been changed while hidden
+        self.run_in_background(buffer.show, priority=TASK_PRIORITY_HIGH,
+                               key=("show", buffer), token=buffer.tasks_token)
+
+    def _schedule_hibernation(self, buffer):
+        """
+        let the buffer release its resources if it's not displayed again for a while
+        """
+        hidden_at = buffer.hidden_at
+
+        def hibernate(*args):
+            if buffer not in self.buffers or buffer is self.current_buffer:
+                return
+            if buffer.hidden_at != hidden_at:
+                # it was displayed meanwhile
+                return
+            self.run_in_background(buffer.hibernate, priority=TASK_PRIORITY_LOW,
+                                   key=("hibernate", buffer), token=buffer.tasks_token)
+        self.loop.set_alarm_in(BUFFER_HIBERNATE_AFTER, hibernate)
 
+    @ui_thread
     def add_and_display_buffer(self, buffer, redraw=True):
         """
         add provided buffer to buffer list and display it
@@ -129,6 +180,7 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
             self.buffers.append(buffer)
         self.display_buffer(buffer, redraw=redraw)
 
+    @ui_thread
     def pick_and_display_buffer(self, i):
         """
         pick i-th buffer from list and display it
@@ -151,6 +203,7 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
     def current_buffer_index(self):
         return self.buffers.index(self.current_buffer)
 
+    @ui_thread
     def remove_current_buffer(self, close_if_no_buffer=False):
         if len(self.buffers) == 1 and not close_if_no_buffer:
             return
@@ -161,6 +214,7 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
             self.display_buffer(self.buffer_movement_history[-1], True)
         return len(self.buffers)
 
+    @ui_thread
     def reload_footer(self, refresh=True, rebuild_statusbar=True):
         logger.debug("reload footer")
         footer = list(self.widget_message_dict.keys())
@@ -205,33 +259,34 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
         columns = urwid.Columns(left_widgets + [buffer_text])
         return urwid.AttrMap(columns, "status")
 
+    @ui_thread
     def remove_notification_message(self, message):
         logger.debug("requested remove of message %r from notif bar", message)
-        with self.notifications_lock:
-            try:
-                w = self.message_widget_dict[message]
-            except KeyError:
-                logger.warning("there is no notification %r displayed: %s",
-                               message, self.message_widget_dict)
-                return
-            else:
-                logger.debug("remove widget %r from new pile", w)
-                del self.widget_message_dict[w]
-                del self.message_widget_dict[message]
+        try:
+            w = self.message_widget_dict[message]
+        except KeyError:
+            logger.warning("there is no notification %r displayed: %s",
+                           message, self.message_widget_dict)
+            return
+        else:
+            logger.debug("remove widget %r from new pile", w)
+            del self.widget_message_dict[w]
+            del self.message_widget_dict[message]
         self.reload_footer(rebuild_statusbar=False)
 
+    @ui_thread
     def remove_widget(self, widget, message=None):
         logger.debug("remove widget %r from notif bar", widget)
-        with self.notifications_lock:
-            try:
-                del self.widget_message_dict[widget]
-            except KeyError:
-                logger.info("widget %s was already removed", widget)
-                return
-            if message:
-                del self.message_widget_dict[message]
+        try:
+            del self.widget_message_dict[widget]
+        except KeyError:
+            logger.info("widget %s was already removed", widget)
+            return
+        if message:
+            del self.message_widget_dict[message]
         self.reload_footer(rebuild_statusbar=False)
 
+    @ui_thread
     def notify_message(self, message, level="info", clear_if_dupl=True,
                        clear_in=CLEAR_NOTIF_BAR_MESSAGE_IN):
         """
@@ -240,16 +295,17 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
         :param clear_if_dupl: bool, if True, don't display the notification again
         :param clear_in: seconds, remove the notificantion after some time
 
-        opens notification popup.
+        opens notification popup; when called from a worker thread, it's displayed later and
+        None is returned
         """
-        with self.notifications_lock:
-            if clear_if_dupl and message in self.message_widget_dict.keys():
-                logger.debug("notification %r is already displayed", message)
-                return
-            logger.debug("display notification %r", message)
-            widget = urwid.AttrMap(urwid.Text(message), "notif_{}".format(level))
+        if clear_if_dupl and message in self.message_widget_dict.keys():
+            logger.debug("notification %r is already displayed", message)
+            return
+        logger.debug("display notification %r", message)
+        widget = urwid.AttrMap(urwid.Text(message), "notif_{}".format(level))
         return self.notify_widget(widget, message=message, clear_in=clear_in)
 
+    @ui_thread
     def notify_widget(self, widget, message=None, clear_in=CLEAR_NOTIF_BAR_MESSAGE_IN):
         """
         opens notification popup.
@@ -269,10 +325,9 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
 
         logger.debug("display notification widget %s", widget)
 
-        with self.notifications_lock:
-            self.widget_message_dict[widget] = message
-            if message:
-                self.message_widget_dict[message] = widget
+        self.widget_message_dict[widget] = message
+        if message:
+            self.message_widget_dict[message] = widget
 
         self.reload_footer(rebuild_statusbar=False)
         self.loop.set_alarm_in(clear_in, clear_notification)
@@ -286,10 +341,15 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
             return
         if queue is None:
             queue = command.priority
+        task_kwargs = {"priority": command.task_priority}
+        if self.current_buffer is not None:
+            task_kwargs["token"] = self.current_buffer.tasks_token
+        if command.coalescing:
+            task_kwargs["key"] = (command.name, self.current_buffer)
         if isinstance(queue, FrontendPriority):
-            self.run_quickly_in_background(command.run)
+            self.run_quickly_in_background(command.run, **task_kwargs)
         elif isinstance(queue, BackendPriority):
-            self.run_in_background(command.run)
+            self.run_in_background(command.run, **task_kwargs)
         elif isinstance(queue, SameThreadPriority):
             logger.info("running command %s", command)
             try:
@@ -340,33 +400,59 @@ class UI(ThreadSafeFrame, ConcurrencyMixin):
 
 
 class ThreadSafeLoop(urwid.MainLoop):
-    def __init__(self, *args, **kwargs):
+    """
+    screen is drawn only in the thread of the user interface, at most max_fps times per second
+    """
+
+    def __init__(self, *args, dispatcher=None, max_fps=REDRAW_MAX_FPS, **kwargs):
         super().__init__(*args, **kwargs)
-        self.refresh_lock = threading.RLock()
+        self.dispatcher = dispatcher or UIThreadDispatcher()
+        self.frame_interval = 1.0 / max_fps
+        self.last_frame_at = 0.0
+        self.redraw_pending = False
 
-    def entering_idle(self):
-        with self.refresh_lock:
-            return super().entering_idle()
+    def draw_screen(self):
+        self.last_frame_at = time.monotonic()
+        super().draw_screen()
 
+    @ui_thread
     def refresh(self):
         """
         explicitly refresh user interface; useful when changing widgets dynamically
+
+        screen is only marked dirty, it's drawn once per frame no matter how many times this
+        was called
         """
-        logger.debug("refresh user interface")
-        with self.refresh_lock:
-            if self.screen.started:
-                self.draw_screen()
+        if self.redraw_pending:
+            return
+        self.redraw_pending = True
+        delay = max(0.0, self.last_frame_at + self.frame_interval - time.monotonic())
+        logger.debug("refresh user interface in %.3f seconds", delay)
+        self.set_alarm_in(delay, self._redraw)
+
+    def _redraw(self, *args):
+        # urwid enters idle after every alarm and draws the screen then
+        self.redraw_pending = False
 
 
-def get_app_in_loop(palette):
-    screen = urwid.raw_display.Screen()
-    screen.set_terminal_properties(256)
+def get_app_in_loop(palette, screen=None):
+    """
+    :param screen: instance of urwid screen, terminal is used by default
+    """
+    if screen is None:
+        screen = urwid.raw_display.Screen()
+        screen.set_terminal_properties(256)
     screen.register_palette(palette)
 
     ui = UI(urwid.SolidFill())
     decorated_ui = urwid.AttrMap(ui, "root")
-    loop = ThreadSafeLoop(decorated_ui, screen=screen, event_loop=urwid.AsyncioEventLoop(),
-                          handle_mouse=False)
+    aio_loop = asyncio.new_event_loop()
+    loop = ThreadSafeLoop(decorated_ui, screen=screen,
+                          event_loop=urwid.AsyncioEventLoop(loop=aio_loop),
+                          handle_mouse=False, dispatcher=ui.dispatcher)
     ui.loop = loop
+    ui.aio_loop = aio_loop
+    # the loop runs in this thread
+    ui.dispatcher.attach(aio_loop)
 
     return loop, ui
@@ -182,11 +182,15 @@ class ContainerInfoView(WidgetBase, View):
         self.docker_container = docker_container
 
         self.stop = threading.Event()
+        # stats are read by a coroutine when docker engine is reachable via asyncio
+        self.stats_future = None
 
         self.view_widgets = []
 
     def refresh(self):
-        self.view_widgets.clear()
+        # body of the widget is replaced in the thread of the user interface, don't change the
+        # list which might be still queued
+        self.view_widgets = []
         self.docker_container.refresh()
 
         self._basic_data()
@@ -323,6 +327,35 @@ class ContainerInfoView(WidgetBase, View):
         ]))
         self.view_widgets.append(RowWidget([SelectableText("")]))
 
+        def show_update(update):
+            logger.debug(update)
+            cpu_percent = update["cpu_percent"]
+            cpu_value.text = "%.2f %%" % cpu_percent
+            cpu_g.rotate_value(int(cpu_percent), max_val=100)
+
+            mem_percent = update["mem_percent"]
+            mem_current = humanize_bytes(update["mem_current"])
+            mem_value.text = "%.2f %% (%s)" % (mem_percent, mem_current)
+            mem_g.rotate_value(int(mem_percent), max_val=100)
+
+            blk_read = update["blk_read"]
+            blk_write = update["blk_write"]
+            blk_r_value.text = humanize_bytes(blk_read)
+            blk_w_value.text = humanize_bytes(blk_write)
+            r_max_val = blk_r_g.rotate_value(blk_read, adaptive_max=True)
+            w_max_val = blk_w_g.rotate_value(blk_write, adaptive_max=True)
+            blk_r_g.set_max(max((r_max_val, w_max_val)))
+            blk_w_g.set_max(max((r_max_val, w_max_val)))
+
+            net_read = update["net_rx"]
+            net_write = update["net_tx"]
+            net_r_value.text = humanize_bytes(net_read)
+            net_w_value.text = humanize_bytes(net_write)
+            r_max_val = net_r_g.rotate_value(net_read, adaptive_max=True)
+            w_max_val = net_w_g.rotate_value(net_write, adaptive_max=True)
+            net_r_g.set_max(max((r_max_val, w_max_val)))
+            net_w_g.set_max(max((r_max_val, w_max_val)))
+
         @log_traceback
         def realtime_updates():
             g = self.docker_container.stats().response
@@ -339,38 +372,28 @@ class ContainerInfoView(WidgetBase, View):
                     # TODO: if debug raise
                     break
 
-                if self.stop.is_set():
+                if stop.is_set():
                     break
-                logger.debug(update)
-                cpu_percent = update["cpu_percent"]
-                cpu_value.text = "%.2f %%" % cpu_percent
-                cpu_g.rotate_value(int(cpu_percent), max_val=100)
-
-                mem_percent = update["mem_percent"]
-                mem_current = humanize_bytes(update["mem_current"])
-                mem_value.text = "%.2f %% (%s)" % (mem_percent, mem_current)
-                mem_g.rotate_value(int(mem_percent), max_val=100)
-
-                blk_read = update["blk_read"]
-                blk_write = update["blk_write"]
-                blk_r_value.text = humanize_bytes(blk_read)
-                blk_w_value.text = humanize_bytes(blk_write)
-                r_max_val = blk_r_g.rotate_value(blk_read, adaptive_max=True)
-                w_max_val = blk_w_g.rotate_value(blk_write, adaptive_max=True)
-                blk_r_g.set_max(max((r_max_val, w_max_val)))
-                blk_w_g.set_max(max((r_max_val, w_max_val)))
-
-                net_read = update["net_rx"]
-                net_write = update["net_tx"]
-                net_r_value.text = humanize_bytes(net_read)
-                net_w_value.text = humanize_bytes(net_write)
-                r_max_val = net_r_g.rotate_value(net_read, adaptive_max=True)
-                w_max_val = net_w_g.rotate_value(net_write, adaptive_max=True)
-                net_r_g.set_max(max((r_max_val, w_max_val)))
-                net_w_g.set_max(max((r_max_val, w_max_val)))
-
-        self.thread = threading.Thread(target=realtime_updates, daemon=True)
-        self.thread.start()
+                self.dispatcher.call(show_update, update)
+
+        async def realtime_updates_async():
+            try:
+                async for update in self.docker_container.stats_async().response:
+                    if stop.is_set():
+                        break
+                    show_update(update)
+            except Exception as ex:
+                logger.error("error while getting stats: %r", ex)
+                self.ui.notify_message("Error while getting stats: %s" % ex, level="error")
+
+        # view is being refreshed, graphs were built again
+        self._stop_stats()
+        stop = self.stop = threading.Event()
+        if self.docker_container.docker_backend.aio_client:
+            self.stats_future = self.ui.run_coroutine(realtime_updates_async())
+        else:
+            self.thread = threading.Thread(target=realtime_updates, daemon=True)
+            self.thread.start()
 
     def _labels(self):
         if not self.docker_container.labels:
@@ -399,5 +422,19 @@ class ContainerInfoView(WidgetBase, View):
             l.extend([RowWidget([SelectableText(x)]) for x in operation.response.splitlines()])
             self.view_widgets.extend(l)
 
-    def destroy(self):
+    def _stop_stats(self):
         self.stop.set()
+        if self.stats_future:
+            self.stats_future.cancel()
+            self.stats_future = None
+
+    def suspend(self):
+        """
+        stop reading stats and free all the widgets, call refresh() to display them again
+        """
+        self._stop_stats()
+        self.view_widgets = []
+        self.set_body([])
+
+    def destroy(self):
+        self._stop_stats()
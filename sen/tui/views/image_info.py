@@ -32,18 +32,21 @@ class ImageInfoWidget(WidgetBase, View):
     """
     def __init__(self, ui, docker_image):
         self.walker = urwid.SimpleFocusListWalker([])
+        self.view_widgets = []
         super().__init__(ui, self.walker)
 
         self.docker_image = docker_image
 
     def refresh(self):
         self.docker_image.refresh()
-        self.walker.clear()
+        # lines are displayed at once, in the thread of the user interface
+        self.view_widgets = []
         self._basic_data()
         self._containers()
         self._image_names()
         self._layers()
         self._labels()
+        self.set_body(self.view_widgets)
         self.set_focus(0)
 
     @property
@@ -77,19 +80,19 @@ class ImageInfoWidget(WidgetBase, View):
                  SelectableText(humanize_bytes(self.docker_image.shared_size))])
         data.append([SelectableText("Command", maps=get_map("main_list_green")),
                      SelectableText(self.docker_image.container_command)])
-        self.walker.extend(assemble_rows(data, ignore_columns=[1]))
+        self.view_widgets.extend(assemble_rows(data, ignore_columns=[1]))
 
     def _image_names(self):
         if not self.docker_image.names:
             return
-        self.walker.append(RowWidget([SelectableText("")]))
-        self.walker.append(RowWidget([SelectableText("Image Names", maps=get_map("main_list_white"))]))
+        self.view_widgets.append(RowWidget([SelectableText("")]))
+        self.view_widgets.append(RowWidget([SelectableText("Image Names", maps=get_map("main_list_white"))]))
         for n in self.docker_image.names:
-            self.walker.append(RowWidget([TagWidget(self.docker_image, n)]))
+            self.view_widgets.append(RowWidget([TagWidget(self.docker_image, n)]))
 
     def _layers(self):
-        self.walker.append(RowWidget([SelectableText("")]))
-        self.walker.append(RowWidget([SelectableText("Layers", maps=get_map("main_list_white"))]))
+        self.view_widgets.append(RowWidget([SelectableText("")]))
+        self.view_widgets.append(RowWidget([SelectableText("Layers", maps=get_map("main_list_white"))]))
 
         i = self.docker_image
         parent = i.parent_image
@@ -98,17 +101,17 @@ class ImageInfoWidget(WidgetBase, View):
 
         if isinstance(parent, RootImage) and len(layers) > 0:  # pulled image, docker 1.10+
             for image in layers:
-                self.walker.append(
+                self.view_widgets.append(
                     RowWidget([LayerWidget(self.ui, image, index=index)])
                 )
                 index += 1
         else:
-            self.walker.append(RowWidget([LayerWidget(self.ui, self.docker_image, index=index)]))
+            self.view_widgets.append(RowWidget([LayerWidget(self.ui, self.docker_image, index=index)]))
             while True:
                 index += 1
                 parent = i.parent_image
                 if parent:
-                    self.walker.append(RowWidget([LayerWidget(self.ui, parent, index=index)]))
+                    self.view_widgets.append(RowWidget([LayerWidget(self.ui, parent, index=index)]))
                     i = parent
                 else:
                     break
@@ -117,16 +120,17 @@ class ImageInfoWidget(WidgetBase, View):
         if not self.docker_image.labels:
             return []
         data = []
-        self.walker.append(RowWidget([SelectableText("")]))
-        self.walker.append(RowWidget([SelectableText("Labels", maps=get_map("main_list_white"))]))
+        self.view_widgets.append(RowWidget([SelectableText("")]))
+        self.view_widgets.append(RowWidget([SelectableText("Labels", maps=get_map("main_list_white"))]))
         for label_key, label_value in self.docker_image.labels.items():
             data.append([SelectableText(label_key, maps=get_map("main_list_green")), SelectableText(label_value)])
-        self.walker.extend(assemble_rows(data, ignore_columns=[1]))
+        self.view_widgets.extend(assemble_rows(data, ignore_columns=[1]))
 
     def _containers(self):
-        if not self.docker_image.containers():
+        containers = self.docker_image.containers()
+        if not containers:
             return
-        self.walker.append(RowWidget([SelectableText("")]))
-        self.walker.append(RowWidget([SelectableText("Containers", maps=get_map("main_list_white"))]))
-        for container in self.docker_image.containers():
-            self.walker.append(RowWidget([ContainerOneLinerWidget(self.ui, container)]))
+        self.view_widgets.append(RowWidget([SelectableText("")]))
+        self.view_widgets.append(RowWidget([SelectableText("Containers", maps=get_map("main_list_white"))]))
+        for container in containers:
+            self.view_widgets.append(RowWidget([ContainerOneLinerWidget(self.ui, container)]))
@@ -1,17 +1,23 @@
+import functools
 import logging
+import operator
 import re
 import threading
 import time
 
 import urwid
 
+from sen.docker_backend import INSPECT_PRIORITY_HIGH, INSPECT_PRIORITY_LOW
 from sen.exceptions import NotifyError, NotAvailableAnymore
-from sen.tui.chunks.misc import get_row
+from sen.tui.chunks.misc import get_row, has_deferred_cells, fill_deferred_cells
+from sen.tui.constants import INSPECT_RETRY_SECONDS
+from sen.tui.scheduler import ui_thread
+from sen.tui.widgets.list.lazy import LazyListWalker
 from sen.tui.widgets.list.util import (
     get_operation_notify_widget, ResponsiveRowWidget
 )
 from sen.tui.widgets.table import ResponsiveTable
-from sen.util import graceful_chain_get
+from sen.tui.widgets.util import SelectableText, get_map
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +25,28 @@ logger = logging.getLogger(__name__)
 class MainLineWidget(ResponsiveRowWidget):
     def __init__(self, docker_object):
         self.docker_object = docker_object
-        super().__init__(get_row(docker_object))
+        # priority with which data for deferred cells were requested
+        self.requested_priority = None
+        # time.monotonic() after which failed inspect is requested again
+        self.retry_inspect_at = None
+        # lines are built while the listing is rendered: the object might have been removed
+        # meanwhile, it's displayed until the listing is refreshed
+        try:
+            row = get_row(docker_object)
+        except NotAvailableAnymore:
+            logger.info("%s is not available anymore", docker_object)
+            row = [SelectableText(docker_object.short_id),
+                   SelectableText("(not available anymore)", maps=get_map("main_list_red"))]
+            self.deferred = False
+        else:
+            self.deferred = has_deferred_cells(docker_object)
+        super().__init__(row)
+
+    def fill_deferred_cells(self):
+        if not self.deferred:
+            return
+        fill_deferred_cells(self.widgets, self.docker_object)
+        self.deferred = False
 
     def matches_search(self, s):
         return self.docker_object.matches_search(s)
@@ -34,48 +61,101 @@ class MainLineWidget(ResponsiveRowWidget):
 class MainListBox(ResponsiveTable):
     def __init__(self, ui, docker_backend):
         self.d = docker_backend
-        super(MainListBox, self).__init__(ui, urwid.SimpleFocusListWalker([]))
-
-        # urwid is not thread safe
-        self.refresh_lock = threading.Lock()
+        # lines are built only for docker objects which are displayed; a refresh rebuilds only
+        # lines of objects which were replaced by the backend
+        walker = LazyListWalker([], MainLineWidget, key=operator.attrgetter("object_id"))
+        super(MainListBox, self).__init__(ui, walker)
 
         # realtime lock
         self.realtime_lock = threading.Lock()
 
         self.stop_realtime_events = threading.Event()
 
-    def refresh(self, query=None):
+    def refresh(self, query=None, cached=False):
         """
         refresh listing, also apply filters
+
+        :param query: str, filter query
+        :param cached: bool, display data from the backend cache, don't query docker engine
         :return:
         """
         logger.info("refresh listing")
-        focus_on_top = len(self.body) == 0  # focus if empty
-        with self.refresh_lock:
-            self.query(query_string=query)
-        if focus_on_top:
-            try:
-                self.set_focus(0)
-            except IndexError:
-                pass
+        self.query(query_string=query, cached=cached)
 
-    def process_realtime_event(self, event):
+    def process_realtime_events(self, events):
+        """
+        the whole batch is displayed with a single refresh
+
+        :param events: list of dicts
+        """
         with self.realtime_lock:
             if self.stop_realtime_events.is_set():
-                logger.info("received docker event when this functionality is disabled")
+                logger.info("received docker events when this functionality is disabled")
                 return
-        delayed_events = ["pause", "unpause"]
-        ev_status = graceful_chain_get(event, "status")
-        if ev_status in delayed_events:
-            # https://github.com/TomasTomecek/sen/issues/143
-            # tl;dr dockerd does not tell us when the container is in pause/unpause state
-            # it sends the event when the container is being paused
-            time.sleep(1)
-        self.refresh(query=self.filter_query)
+        # backend has already updated its model according to the events; state of paused and
+        # unpaused containers is checked again by the backend after a while
+        self.refresh(query=self.filter_query, cached=True)
 
     def filter(self, s, widgets_to_filter=None):
         self.refresh(query=s)
 
+    def load_deferred_cells(self, lines, priority):
+        """
+        fill cells which need inspect data in the background
+
+        :param lines: list of MainLineWidget
+        :param priority: int, INSPECT_PRIORITY_*, visible lines should go first
+        """
+        to_load = []
+        for line in lines:
+            if not line.deferred:
+                continue
+            if line.docker_object.is_inspected:
+                line.fill_deferred_cells()
+                continue
+            if line.retry_inspect_at is not None:
+                if time.monotonic() < line.retry_inspect_at:
+                    continue
+                line.retry_inspect_at = None
+                line.requested_priority = None
+            if line.requested_priority is None or priority < line.requested_priority:
+                line.requested_priority = priority
+                to_load.append(line)
+        if not to_load:
+            return
+        if priority == INSPECT_PRIORITY_HIGH:
+            # visible lines: display every cell as soon as possible
+            for line in to_load:
+                self.d.prefetcher.prefetch([line.docker_object], priority=priority,
+                                           callback=functools.partial(self._cells_loaded, [line]))
+        else:
+            self.d.prefetcher.prefetch([x.docker_object for x in to_load], priority=priority,
+                                       callback=functools.partial(self._cells_loaded, to_load))
+
+    @ui_thread
+    def _cells_loaded(self, lines, batch):
+        filled = False
+        for line in lines:
+            if not line.docker_object.is_inspected:
+                # inspect failed, the line is requested again once it's displayed after a while
+                line.retry_inspect_at = time.monotonic() + INSPECT_RETRY_SECONDS
+                continue
+            line.fill_deferred_cells()
+            self.row_changed(line)
+            filled = True
+        if filled:
+            self.ui.refresh()
+
+    @ui_thread
+    def _objects_inspected(self, batch):
+        # lines of the objects might not be built yet, they get the data once they are
+        lines = [x for x in self.body.built_rows() if x.deferred and x.docker_object.is_inspected]
+        self._cells_loaded(lines, batch)
+
+    def render(self, size, focus=False):
+        self.load_deferred_cells(self.visible_rows(size, focus), INSPECT_PRIORITY_HIGH)
+        return super().render(size, focus=focus)
+
     def toggle_realtime_events(self):
         with self.realtime_lock:
             if self.stop_realtime_events.is_set():
@@ -86,11 +166,12 @@ class MainListBox(ResponsiveTable):
                 self.ui.notify_message("Disabling live updates from docker.")
         self.ui.reload_footer()
 
-    def query(self, query_string=""):
+    def query(self, query_string="", cached=False):
         """
         query and display, also apply filters
 
         :param query_string: str
+        :param cached: bool, use data cached in the backend
         :return: None
         """
 
@@ -104,7 +185,7 @@ class MainListBox(ResponsiveTable):
 
         # FIXME: this could be part of filter command since it's command line
         backend_query = {
-            "cached": False,
+            "cached": cached,
             "containers": True,
             "images": True,
         }
@@ -124,6 +205,9 @@ class MainListBox(ResponsiveTable):
             backend_query["cached"] = True
             backend_query["images"] = False
 
+        def precise_order():
+            backend_query["precise_sort"] = True
+
         query_conf = [
             {
                 "query_keys": ["t", "type"],
@@ -137,6 +221,10 @@ class MainListBox(ResponsiveTable):
                 "query_keys": ["s", "state"],
                 "query_values": ["r", "running"],
                 "callback": running
+            }, {
+                "query_keys": ["o", "order"],
+                "query_values": ["p", "precise"],
+                "callback": precise_order
             },
         ]
         query_list = re.split(r"[\s,]", self.filter_query)
@@ -158,27 +246,38 @@ class MainListBox(ResponsiveTable):
                 else:
                     raise NotifyError("Invalid query string: %r", query_str)
 
-        widgets = []
         logger.debug("doing query %s", backend_query)
         query, c_op, i_op = self.d.filter(**backend_query)
-
-        for o in query:
-            try:
-                line = MainLineWidget(o)
-            except NotAvailableAnymore:
-                continue
-            widgets.append(line)
-        if unprocessed:
-            new_query = " ".join(unprocessed)
-            logger.debug("doing parent query for unprocessed string: %r", new_query)
-            super().filter(new_query, widgets_to_filter=widgets)
-        else:
-            self.set_body(widgets)
-            self.ro_content = widgets
+        self._display(query, unprocessed)
 
         query_notify(i_op)
         query_notify(c_op)
 
+    @ui_thread
+    def _display(self, docker_objects, unprocessed):
+        """
+        display lines of the provided objects; lines are built once they are displayed
+
+        :param docker_objects: list of DockerObject
+        :param unprocessed: list of str, parts of the query string which filter the lines
+        """
+        focus_on_top = len(self.body) == 0  # focus if empty
+        if unprocessed:
+            new_query = " ".join(unprocessed)
+            logger.debug("filtering lines with unprocessed string: %r", new_query)
+            docker_objects = [x for x in docker_objects if x.matches_search(new_query)]
+        self.body.set_items(docker_objects)
+        self.rows_replaced(self.body.built_rows())
+        if focus_on_top:
+            try:
+                self.set_focus(0)
+            except IndexError:
+                pass
+        to_load = [x for x in docker_objects if has_deferred_cells(x)]
+        if to_load:
+            self.d.prefetcher.prefetch(to_load, priority=INSPECT_PRIORITY_LOW,
+                                       callback=self._objects_inspected)
+
     def status_bar(self):
         columns_list = []
 
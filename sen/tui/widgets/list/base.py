@@ -1,8 +1,8 @@
 import logging
-import threading
 
 import urwid
 from sen.exceptions import NotifyError
+from sen.tui.scheduler import ui_thread
 
 
 logger = logging.getLogger(__name__)
@@ -19,16 +19,23 @@ class WidgetBase(urwid.ListBox):
         self.filter_query = ""
         super().__init__(*args, **kwargs)
         self.ro_content = self.body[:]  # unfiltered content of a widget
-        self.body_change_lock = threading.Lock()
 
+    @property
+    def dispatcher(self):
+        return self.ui.dispatcher
+
+    @ui_thread
     def set_body(self, widgets):
-        with self.body_change_lock:
-            self.body[:] = widgets
+        self.body[:] = widgets
+
+    @ui_thread
+    def set_focus(self, position, coming_from=None):
+        super().set_focus(position, coming_from=coming_from)
 
+    @ui_thread
     def reload_widget(self):
         # this is the easiest way to refresh body
-        with self.body_change_lock:
-            self.body[:] = self.body
+        self._invalidate()
 
     def _search(self, reverse_search=False):
         if self.search_string is None:
@@ -5,6 +5,7 @@ import traceback
 
 import urwid
 
+from sen.tui.scheduler import ui_thread
 from sen.tui.widgets.list.base import WidgetBase
 from sen.util import _ensure_unicode
 
@@ -72,14 +73,19 @@ class ScrollableListBox(WidgetBase):
     def __init__(self, ui, text, focus_bottom=True):
         self.walker = urwid.SimpleFocusListWalker([])
         super().__init__(ui, self.walker)
-        self.set_text(text)
+        # the widget is not displayed yet, it can be changed in any thread
+        self._set_text(text)
         if focus_bottom:
             try:
-                self.set_focus(len(self.walker) - 2)
+                self.walker.set_focus(len(self.walker) - 2)
             except IndexError:
                 pass
 
+    @ui_thread
     def set_text(self, text):
+        self._set_text(text)
+
+    def _set_text(self, text):
         self.walker.clear()
         text = _ensure_unicode(text)
         # logger.debug(repr(text))
@@ -93,59 +99,121 @@ class ScrollableListBox(WidgetBase):
 
 class AsyncScrollableListBox(WidgetBase):
     def __init__(self, generator, ui, static_data=None):
-        self.log_texts = []
+        """
+        :param generator: iterator or async iterator of log chunks; async iterators are consumed
+                          in the event loop of the user interface, iterators in a thread
+        """
+        super(AsyncScrollableListBox, self).__init__(ui, urwid.SimpleFocusListWalker([]))
+        self.line_w = None
+        self.stop = threading.Event()
+        self.thread = self.future = None
+        self.start(generator, static_data=static_data)
+
+    @ui_thread
+    def start(self, generator, static_data=None):
+        """
+        display static data and start reading the generator; lines are added in the thread of
+        the user interface
+        """
+        log_texts = []
         if static_data:
             static_data = _ensure_unicode(static_data).split("\n")
             for d in static_data:
                 log_entry = d.rstrip()
                 if log_entry:
-                    self.log_texts.append(urwid.Text(("main_list_dg", log_entry),
-                                                     align="left", wrap="any"))
-        walker = urwid.SimpleFocusListWalker(self.log_texts)
-        super(AsyncScrollableListBox, self).__init__(ui, walker)
-        walker.set_focus(len(walker) - 1)
+                    log_texts.append(urwid.Text(("main_list_dg", log_entry),
+                                                align="left", wrap="any"))
+        self.set_body(log_texts)
+        self.body.set_focus(len(self.body) - 1)
+        # every stream has its own event so it never continues with a different one
+        stop = self.stop = threading.Event()
+        ui = self.ui
+        dispatcher = self.dispatcher
+
+        def run_in_ui_thread(func, *args):
+            def run():
+                # the stream could have been stopped while the call was queued
+                if not stop.is_set():
+                    func(*args)
+            dispatcher.call(run)
 
         def fetch_logs():
-            line_w = urwid.AttrMap(
-                urwid.Text("", align="left", wrap="any"), "main_list_dg", "main_list_white"
-            )
-            walker.append(line_w)
-
+            run_in_ui_thread(self._start_line)
             while True:
                 try:
                     line = next(generator)
                 except StopIteration:
-                    logger.info("no more logs")
-                    line_w = urwid.AttrMap(
-                        urwid.Text("No more logs.", align="left", wrap="any"),
-                        "main_list_dg", "main_list_white"
-                    )
-                    walker.append(line_w)
-                    walker.set_focus(len(walker) - 1)
+                    run_in_ui_thread(self._no_more_logs)
                     break
                 except Exception as ex:
                     logger.error(traceback.format_exc())
                     ui.notify_message("Error while fetching logs: %s", ex)
                     break
-                line = _ensure_unicode(line)
-                if self.stop.is_set():
+                if stop.is_set():
                     break
-                if self.filter_query:
-                    if self.filter_query not in line:
-                        continue
-                line_w.original_widget.set_text(line_w.original_widget.text + line.rstrip("\r\n"))
-                if line.endswith("\n"):
-                    walker.set_focus(len(walker) - 1)
-                    line_w = urwid.AttrMap(
-                        urwid.Text("", align="left", wrap="any"), "main_list_dg", "main_list_white"
-                    )
-                    walker.append(line_w)
-                ui.refresh()
+                run_in_ui_thread(self._add_line, line)
 
-        self.stop = threading.Event()
-        self.thread = threading.Thread(target=fetch_logs, daemon=True)
-        self.thread.start()
+        async def fetch_logs_async():
+            # coroutines run in the thread of the user interface
+            self._start_line()
+            try:
+                async for line in generator:
+                    if stop.is_set():
+                        return
+                    self._add_line(line)
+            except Exception as ex:
+                logger.error(traceback.format_exc())
+                ui.notify_message("Error while fetching logs: %s", ex)
+            else:
+                self._no_more_logs()
+
+        self.thread = self.future = None
+        if hasattr(generator, "__anext__"):
+            self.future = ui.run_coroutine(fetch_logs_async())
+        else:
+            self.thread = threading.Thread(target=fetch_logs, daemon=True)
+            self.thread.start()
+
+    @ui_thread
+    def suspend(self):
+        """
+        stop reading logs and free the lines, call start() to continue
+        """
+        self.destroy()
+        self.set_body([])
+        self.line_w = None
+
+    def _start_line(self):
+        self.line_w = urwid.AttrMap(
+            urwid.Text("", align="left", wrap="any"), "main_list_dg", "main_list_white"
+        )
+        self.body.append(self.line_w)
+
+    def _no_more_logs(self):
+        logger.info("no more logs")
+        line_w = urwid.AttrMap(
+            urwid.Text("No more logs.", align="left", wrap="any"),
+            "main_list_dg", "main_list_white"
+        )
+        self.body.append(line_w)
+        self.body.set_focus(len(self.body) - 1)
+
+    def _add_line(self, line):
+        if self.line_w is None:
+            # suspended
+            return
+        line = _ensure_unicode(line)
+        if self.filter_query:
+            if self.filter_query not in line:
+                return
+        text_w = self.line_w.original_widget
+        text_w.set_text(text_w.text + line.rstrip("\r\n"))
+        if line.endswith("\n"):
+            self.body.set_focus(len(self.body) - 1)
+            self._start_line()
+        self.ui.refresh()
 
     def destroy(self):
         self.stop.set()
-
+        if self.future:
+            self.future.cancel()
@@ -0,0 +1,104 @@
+import collections
+import logging
+
+import urwid
+
+from sen.tui.constants import LAZY_WALKER_CACHE_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+
+class LazyListWalker(urwid.ListWalker):
+    """
+    list walker backed by a list of items (e.g. docker objects): a row widget is built only
+    when urwid asks for its position, recently built rows are kept in a small LRU cache
+
+    rows are cached by key of their item, so they survive when the items are replaced: a row is
+    reused as long as its item is the very same object
+    """
+
+    def __init__(self, items, row_factory, cache_size=LAZY_WALKER_CACHE_SIZE, key=id):
+        """
+        :param items: list
+        :param row_factory: callable, creates row widget for an item
+        :param cache_size: int, how many built rows are kept
+        :param key: callable, returns key which identifies an item, e.g. ID of a docker object
+        """
+        self.items = items
+        self.row_factory = row_factory
+        self.cache_size = cache_size
+        self.key = key
+        self.focus = 0
+        self._rows = collections.OrderedDict()  # key -> (item, row widget)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[x] for x in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self.items)
+        if not 0 <= position < len(self.items):
+            raise IndexError(position)
+        item = self.items[position]
+        key = self.key(item)
+        try:
+            cached_item, row = self._rows[key]
+        except KeyError:
+            cached_item, row = None, None
+        if cached_item is item:
+            self._rows.move_to_end(key)
+            return row
+        row = self.row_factory(item)
+        self._rows[key] = (item, row)
+        self._rows.move_to_end(key)
+        if len(self._rows) > self.cache_size:
+            self._rows.popitem(last=False)
+        return row
+
+    def set_items(self, items):
+        """
+        display provided items instead of the current ones: rows of items which are kept are
+        reused, focus stays on the same item (or on the same position if the item is gone)
+        """
+        keys = [self.key(x) for x in items]
+        focused_key = self.key(self.items[self.focus]) if self.items else None
+        new_items = dict(zip(keys, items))
+        for key, (item, _) in list(self._rows.items()):
+            if new_items.get(key) is not item:
+                del self._rows[key]
+        self.items = items
+        try:
+            self.focus = keys.index(focused_key)
+        except ValueError:
+            self.focus = max(0, min(self.focus, len(items) - 1))
+        self._modified()
+
+    def built_rows(self):
+        """
+        :return: list of rows which are currently built
+        """
+        return [row for _, row in self._rows.values()]
+
+    def set_focus(self, position):
+        if not 0 <= position < len(self.items):
+            raise IndexError(position)
+        self.focus = position
+        self._modified()
+
+    def next_position(self, position):
+        if position + 1 >= len(self.items):
+            raise IndexError(position)
+        return position + 1
+
+    def prev_position(self, position):
+        if position <= 0:
+            raise IndexError(position)
+        return position - 1
+
+    def positions(self, reverse=False):
+        if reverse:
+            return range(len(self.items) - 1, -1, -1)
+        return range(len(self.items))
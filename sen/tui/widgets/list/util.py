@@ -60,20 +60,36 @@ def get_time_attr_map(t):
 
 
 class UnselectableRowWidget(urwid.AttrMap):
+    """
+    cells are always rendered with their normal attributes, the focused row maps them to focus
+    attributes of the cells: changing focus doesn't invalidate the cells, so urwid keeps both
+    canvases of the row cached until its content changes
+    """
     def __init__(self, columns, attr="main_list_dg", focus_map=MAIN_LIST_FOCUS, dividechars=1):
         self.widgets = columns
         self.columns = urwid.Columns(columns, dividechars=dividechars)
-        super().__init__(self.columns, attr, focus_map=focus_map)
+        super().__init__(self.columns, attr, focus_map=self.get_row_focus_map(focus_map))
 
     @property
     def contents(self):
         return self.columns.contents
 
-    def render(self, size, focus=False):
-        for w in self.columns.widget_list:
-            if hasattr(w, "set_map"):
-                w.set_map('focus' if focus else 'normal')
-        return urwid.AttrMap.render(self, size, focus)
+    def get_row_focus_map(self, focus_map):
+        """
+        :param focus_map: str, attribute of the focused row
+        :return: dict, attribute mapping of the focused row
+        """
+        row_focus_map = {None: focus_map}
+        for w, _ in self.columns.contents:
+            attr_maps = getattr(w, "attr_maps", None)
+            if attr_maps is None:
+                continue
+            focus_attr = w.maps["focus"]
+            for a in attr_maps["normal"].values():
+                row_focus_map[a] = focus_attr
+            for a in getattr(w, "attrs", []):
+                row_focus_map[a] = focus_attr
+        return row_focus_map
 
 
 class RowWidget(UnselectableRowWidget):
@@ -90,4 +106,5 @@ class ResponsiveRowWidget(RowWidget):
     def __init__(self, columns, attr="main_list_dg", focus_map=MAIN_LIST_FOCUS, dividechars=1):
         self.widgets = columns
         self.columns = ResponsiveColumns(columns, dividechars=dividechars)
-        urwid.AttrMap.__init__(self, self.columns, attr, focus_map=focus_map)
+        urwid.AttrMap.__init__(self, self.columns, attr,
+                               focus_map=self.get_row_focus_map(focus_map))
@@ -1,37 +1,15 @@
 import logging
+import weakref
 
 import urwid
 
+from sen.tui.scheduler import ui_thread
 from sen.tui.widgets.list.base import WidgetBase
 from sen.tui.widgets.list.util import RowWidget
 
 logger = logging.getLogger(__name__)
 
 
-def calculate_max_cols_length(table, size):
-    """
-    :param table: list of lists:
-
-    [["row 1 column 1", "row 1 column 2"],
-     ["row 2 column 1", "row 2 column 2"]]
-
-    each item consists of instance of urwid.Text
-
-    :returns dict, {index: width}
-    """
-    max_cols_lengths = {}
-
-    for row in table:
-        col_index = 0
-        for idx, widget in enumerate(row.widgets):
-            l = widget.pack((size[0], ))[0]
-            max_cols_lengths[idx] = max(max_cols_lengths.get(idx, 0), l)
-            col_index += 1
-
-    max_cols_lengths.setdefault(0, 1)  # in case table is empty
-    return max_cols_lengths
-
-
 def assemble_rows(data, max_allowed_lengths=None, dividechars=1,
                   ignore_columns=None):
     """
@@ -81,6 +59,13 @@ def assemble_rows(data, max_allowed_lengths=None, dividechars=1,
 
 
 class ResponsiveTable(WidgetBase):
+    """
+    widths of cells are measured once per row and screen width, visible rows are laid out
+    again only when widths of columns change
+
+    widths of columns grow as cells get longer; they shrink once rows are replaced
+    """
+
     def __init__(self, ui, walker, headers=None, dividechars=1, responsive=True):
         """
         :param walker: list of ResponsiveRow instances
@@ -91,11 +76,91 @@ class ResponsiveTable(WidgetBase):
 
         super().__init__(ui, walker)
 
-    def render(self, size, focus=False):
-        screen_width = size[0]
+        self._screen_width = None
+        # row -> tuple, widths of its cells
+        self._cells_widths = weakref.WeakKeyDictionary()
+        # column index -> width of the widest cell
+        self._max_widths = {}
+        # rows which are not measured yet
+        self._unmeasured = self._all_rows()
+        # (screen width, widest cells) -> widths of columns
+        self._column_widths_key = None
+        self._column_widths = None
+        # row -> widths of columns it's laid out with
+        self._laid_out = weakref.WeakKeyDictionary()
+
+    def _all_rows(self):
+        """
+        lazy walkers (LazyListWalker) provide only rows which are built
+        """
+        built_rows = getattr(self.body, "built_rows", None)
+        if built_rows is None:
+            return list(self.body)
+        return built_rows()
+
+    @ui_thread
+    def set_body(self, widgets):
+        super().set_body(widgets)
+        self.rows_replaced(widgets)
+
+    def rows_replaced(self, rows):
+        """
+        content of the table was replaced: forget widths of rows which were removed
+
+        :param rows: list of rows which are in the table now
+        """
+        cells_widths = weakref.WeakKeyDictionary()
+        self._unmeasured = []
+        for row in rows:
+            try:
+                cells_widths[row] = self._cells_widths[row]
+            except KeyError:
+                self._unmeasured.append(row)
+        self._cells_widths = cells_widths
+        self._max_widths = {}
+        for widths in cells_widths.values():
+            self._update_max_widths(widths)
+
+    def row_changed(self, row):
+        """
+        text of cells in the row was changed, measure them again
+        """
+        self._cells_widths.pop(row, None)
+        self._unmeasured.append(row)
+
+    def _update_max_widths(self, widths):
+        for idx, width in enumerate(widths):
+            if width > self._max_widths.get(idx, 0):
+                self._max_widths[idx] = width
+
+    def _measure(self, rows, screen_width):
+        for row in rows:
+            if row in self._cells_widths:
+                continue
+            widths = tuple(w.pack((screen_width, ))[0] for w in row.widgets)
+            self._cells_widths[row] = widths
+            self._update_max_widths(widths)
+
+    def visible_rows(self, size, focus=False):
+        """
+        :return: list of rows which are displayed when the table is rendered with given size
+        """
+        middle, top, bottom = self.calculate_visible(size, focus)
+        if middle is None:
+            return []
+        return [middle[1]] + [x[0] for x in top[1]] + [x[0] for x in bottom[1]]
+
+    def get_column_widths(self, screen_width):
+        """
+        :return: dict, {column index: width}
+        """
+        key = (screen_width, tuple(sorted(self._max_widths.items())))
+        if key == self._column_widths_key:
+            return self._column_widths
 
         # max text length for each column -- table
-        min_col_lengths = calculate_max_cols_length(self.body, size)
+        min_col_lengths = dict(self._max_widths)
+        min_col_lengths.setdefault(0, 1)  # in case table is empty
 
         # compute maximal column width -- looks nicer
         max_col_width = int(screen_width / len(min_col_lengths)) - self.dividechars
@@ -123,10 +188,32 @@ class ResponsiveTable(WidgetBase):
                 # add remaining to the longest col
                 min_col_lengths[longest_col] += spread_remaining
 
-        for row in self.body:
+        self._column_widths_key = key
+        self._column_widths = min_col_lengths
+        return min_col_lengths
+
+    def render(self, size, focus=False):
+        screen_width = size[0]
+        if screen_width != self._screen_width:
+            # cells are measured within the width of the screen
+            self._screen_width = screen_width
+            self._cells_widths = weakref.WeakKeyDictionary()
+            self._max_widths = {}
+            self._unmeasured = self._all_rows()
+
+        rows = self.visible_rows(size, focus)
+        self._measure(self._unmeasured, screen_width)
+        self._unmeasured = []
+        self._measure(rows, screen_width)
+
+        column_widths = self.get_column_widths(screen_width)
+        for row in rows:
+            if self._laid_out.get(row) is column_widths:
+                continue
             row.contents[:] = [
-                (w, (urwid.GIVEN, min_col_lengths[idx], is_box))
+                (w, (urwid.GIVEN, column_widths[idx], is_box))
                 for idx, (w, (_, _, is_box)) in enumerate(row.contents)
             ]
+            self._laid_out[row] = column_widths
 
         return super().render(size, focus=focus)
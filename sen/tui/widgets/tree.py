@@ -34,14 +34,14 @@ class TreeBackend(urwidtrees.Tree):
     def first_child_position(self, pos):
         ch = pos.children
         if ch:
-            return pos.children[0]
+            return ch[0]
         else:
             return None
 
     def last_child_position(self, pos):
         ch = pos.children
         if ch:
-            return pos.children[-1]
+            return ch[-1]
         else:
             return None
 
@@ -1,9 +1,9 @@
 import logging
-import threading
 
 import urwid
 
 from sen.tui.constants import MAIN_LIST_FOCUS
+from sen.tui.scheduler import ui_thread
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +23,12 @@ class AdHocAttrMap(urwid.AttrMap):
         urwid.AttrMap.__init__(self, w, maps[init_map])
         if isinstance(w, urwid.Text):
             self.attrs = [x[0] for x in self.original_widget.get_text()[1]]
+        # attribute mappings are built once, set_map only switches between them
+        self.attr_maps = {x: self._build_attr_map(x) for x in maps}
+        self.current_map = init_map
+        self.set_attr_map(self.attr_maps[init_map])
 
-    def set_map(self, attrstring):
+    def _build_attr_map(self, attrstring):
         attr_map = {None: self.maps[attrstring]}
 
         # for urwid.Text only: do hovering for all markups in the widget
@@ -35,7 +39,14 @@ class AdHocAttrMap(urwid.AttrMap):
             elif attrstring == "focus":
                 for a in self.attrs:
                     attr_map[a] = self.maps["focus"]
-        self.set_attr_map(attr_map)
+        return attr_map
+
+    def set_map(self, attrstring):
+        # changing the mapping invalidates canvases of the widget and of the row it's in
+        if attrstring == self.current_map:
+            return
+        self.current_map = attrstring
+        self.set_attr_map(self.attr_maps[attrstring])
 
 
 class ColorTextMixin:
@@ -64,25 +75,23 @@ class SelectableText(ColorTextMixin, AdHocAttrMap):
 
 
 class ThreadSafeFrame(urwid.Frame):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.update_lock = threading.Lock()
+    """
+    parts of the frame are replaced in the thread of the user interface only, subclasses provide
+    the dispatcher (sen.tui.scheduler.UIThreadDispatcher)
+    """
+    dispatcher = None
 
+    @ui_thread
     def set_body(self, body):
-        with self.update_lock:
-            return super().set_body(body=body)
+        return super().set_body(body=body)
 
+    @ui_thread
     def set_footer(self, footer):
-        with self.update_lock:
-            return super().set_footer(footer=footer)
+        return super().set_footer(footer=footer)
 
+    @ui_thread
     def set_header(self, header):
-        with self.update_lock:
-            return super().set_header(header=header)
-
-    def render(self, size, focus=False):
-        with self.update_lock:
-            return super().render(size=size, focus=focus)
+        return super().set_header(header=header)
 
 
 class UnselectableListBox(urwid.ListBox):
@@ -1,9 +1,14 @@
 """
 This suite should test whether sen is capable of running in concurrent high load environment
 """
+import asyncio
 import random
 import threading
 
+from sen.tui.scheduler import (
+    TaskScheduler, CancellationToken, UIThreadDispatcher, ui_thread,
+    TASK_PRIORITY_HIGH, TASK_PRIORITY_LOW
+)
 from sen.tui.ui import UI
 from sen.tui.widgets.list.base import WidgetBase
 
@@ -14,6 +19,7 @@ from .utils import get_random_text_widget, get_random_text
 
 class MockUI:
     buffers = []
+    dispatcher = UIThreadDispatcher()
 
     def refresh(self):
         pass
@@ -75,3 +81,111 @@ def test_main_frame():
         frame.render((70, 70))
     nt.join()
     bt.join()
+
+
+def run_queued(scheduler, tasks):
+    """
+    queue tasks while the only worker is busy, return names of tasks in the order they ran
+    """
+    started = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+    ran = []
+
+    def block():
+        started.set()
+        release.wait(5)
+    scheduler.submit(block)
+    started.wait(5)
+    for name, kwargs in tasks:
+        scheduler.submit(ran.append, name, **kwargs)
+    scheduler.submit(done.set, priority=float("inf"))
+    release.set()
+    assert done.wait(5)
+    return ran
+
+
+def test_scheduler_priority():
+    s = TaskScheduler(1)
+    ran = run_queued(s, [("low", {"priority": TASK_PRIORITY_LOW}),
+                         ("normal-1", {}),
+                         ("high", {"priority": TASK_PRIORITY_HIGH}),
+                         ("normal-2", {})])
+    assert ran == ["high", "normal-1", "normal-2", "low"]
+
+
+def test_scheduler_coalescing_and_cancellation():
+    s = TaskScheduler(1)
+    token = CancellationToken()
+    token.cancel()
+    ran = run_queued(s, [("refresh-1", {"key": "refresh"}),
+                         ("other", {"key": "other"}),
+                         ("cancelled", {"token": token}),
+                         ("refresh-2", {"key": "refresh"})])
+    assert ran == ["other", "refresh-2"]
+
+
+def test_scheduler_shutdown():
+    s = TaskScheduler(2)
+    ran = []
+    s.shutdown()
+    assert s.submit(ran.append, 1) is None
+    assert ran == []
+
+
+def test_ui_thread_dispatcher():
+    mutated_in = set()
+
+    class RecordingWidget(WidgetBase):
+        @ui_thread
+        def set_body(self, widgets):
+            mutated_in.add(threading.get_ident())
+            super().set_body(widgets)
+
+    ui = MockUI()
+    ui.dispatcher = UIThreadDispatcher()
+    frame = RecordingWidget(ui, urwid.SimpleFocusListWalker([get_random_text_widget()]))
+    aio_loop = asyncio.new_event_loop()
+    attached = threading.Event()
+    stopped = threading.Event()
+    ui_thread_ids = []
+
+    async def render():
+        ui.dispatcher.attach(aio_loop)
+        ui_thread_ids.append(threading.get_ident())
+        attached.set()
+        while not stopped.is_set():
+            frame.render((70, 20))
+            await asyncio.sleep(0)
+
+    def run_loop():
+        asyncio.set_event_loop(aio_loop)
+        aio_loop.run_until_complete(render())
+
+    lt = threading.Thread(target=run_loop, daemon=True)
+    lt.start()
+    assert attached.wait(5)
+
+    bodies = []
+
+    def change_body():
+        for _ in range(100):
+            body = [get_random_text_widget() for _ in range(random.randint(1, 20))]
+            bodies.append(body)
+            frame.set_body(body)
+            frame.reload_widget()
+
+    workers = [threading.Thread(target=change_body, daemon=True) for _ in range(4)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    done = threading.Event()
+    ui.dispatcher.call(done.set)
+    assert done.wait(5)
+    stopped.set()
+    lt.join(5)
+    aio_loop.close()
+
+    assert mutated_in == set(ui_thread_ids)
+    assert any(list(frame.body) == body for body in bodies)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import struct
+
+import docker.errors
+import pytest
+
+from sen.docker_aio import AsyncDockerClient, get_unix_socket_path, DEFAULT_SOCKET_PATH
+from sen.docker_backend import StatsCalculator
+
+
+def chunked(*chunks):
+    body = b""
+    for chunk in chunks:
+        body += b"%x\r\n%s\r\n" % (len(chunk), chunk)
+    return b"Transfer-Encoding: chunked\r\n\r\n" + body + b"0\r\n\r\n"
+
+
+def log_frame(stream, payload):
+    return struct.pack(">BxxxL", stream, len(payload)) + payload
+
+
+STATS = {
+    "blkio_stats": {},
+    "networks": {},
+    "memory_stats": {"usage": 50, "limit": 100},
+    "cpu_stats": {"cpu_usage": {"total_usage": 200, "percpu_usage": [1, 1]},
+                  "system_cpu_usage": 1000},
+    "precpu_stats": {"cpu_usage": {"total_usage": 100}, "system_cpu_usage": 500},
+}
+
+RESPONSES = {
+    "/v1.41/containers/missing/logs?stdout=1&stderr=1&follow=0&tail=all": (
+        404, b"Content-Length: 24\r\n\r\n{\"message\": \"not found\"}"),
+    # objects and frames are split across chunks on purpose
+    "/v1.41/events": (200, chunked(b'{"Type": "container", "Action": "start"}\n{"Type": "con',
+                                   b'tainer", "Action": "die"}\n')),
+    # "é" is split between two chunks
+    "/v1.41/events?filters=%7B%22type%22%3A+%5B%22container%22%5D%7D": (
+        200, chunked('{"Type": "container", "Actor": {"Attributes": {"name": "caf'.encode("utf-8")
+                     + "é".encode("utf-8")[:1],
+                     "é".encode("utf-8")[1:] + b'"}}}\n')),
+    "/v1.41/containers/abc/stats?stream=1": (200, chunked(json.dumps(STATS).encode("utf-8"))),
+    "/v1.41/containers/abc/logs?stdout=1&stderr=1&follow=1&tail=0": (
+        200, chunked((log_frame(1, b"hello\n") + log_frame(2, b"world\n"))[:20],
+                     (log_frame(1, b"hello\n") + log_frame(2, b"world\n"))[20:])),
+    "/v1.41/containers/tty/logs?stdout=1&stderr=1&follow=0&tail=all": (
+        200, b"\r\n" + b"hello from tty\n"),
+}
+
+
+def get_handler(responses, requests, keep_open=()):
+    """
+    handler of connections to fake docker engine
+
+    :param responses: dict, path with query -> (status, rest of the response); paths without
+                      query match any query
+    :param requests: list, requested paths are appended here
+    :param keep_open: paths without query whose responses never end, e.g. events
+    """
+    async def handle(reader, writer):
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        path = request_line.decode("ascii").split(" ")[1]
+        requests.append(path)
+        path_without_query = path.split("?", 1)[0]
+        status, rest = responses.get(path) or responses[path_without_query]
+        writer.write(b"HTTP/1.1 %d OK\r\nContent-Type: application/json\r\n" % status + rest)
+        await writer.drain()
+        if path_without_query in keep_open:
+            # until the client closes the connection
+            await reader.read()
+        writer.close()
+    return handle
+
+
+def serve(socket_path, coro_factory):
+    """
+    run fake docker engine listening on socket_path and return result of the coroutine
+    """
+    requests = []
+
+    async def main():
+        server = await asyncio.start_unix_server(get_handler(RESPONSES, requests),
+                                                 path=socket_path)
+        async with server:
+            return await coro_factory(AsyncDockerClient(socket_path, "1.41"))
+
+    return asyncio.run(main()), requests
+
+
+async def collect(agen):
+    return [x async for x in agen]
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "docker.sock")
+
+
+@pytest.mark.parametrize("base_url,expected", [
+    (None, DEFAULT_SOCKET_PATH),
+    ("unix:///var/run/docker.sock", "/var/run/docker.sock"),
+    ("http+unix:///tmp/d.sock", "/tmp/d.sock"),
+    ("tcp://127.0.0.1:2375", None),
+])
+def test_get_unix_socket_path(base_url, expected):
+    assert get_unix_socket_path(base_url) == expected
+
+
+def test_not_found(socket_path):
+    with pytest.raises(docker.errors.NotFound):
+        serve(socket_path, lambda c: collect(c.logs("missing")))
+
+
+def test_events(socket_path):
+    async def events(c):
+        return await collect(await c.events())
+    response, _ = serve(socket_path, events)
+    assert response == [{"Type": "container", "Action": "start"},
+                        {"Type": "container", "Action": "die"}]
+
+
+def test_events_split_character(socket_path):
+    async def events(c):
+        return await collect(await c.events(filters={"type": ["container"]}))
+    response, _ = serve(socket_path, events)
+    assert response == [{"Type": "container", "Actor": {"Attributes": {"name": "café"}}}]
+
+
+def test_stats(socket_path):
+    response, _ = serve(socket_path, lambda c: collect(c.stats("abc")))
+    assert response == [STATS]
+    stats = StatsCalculator().process(response[0])
+    assert stats["mem_percent"] == 50.0
+    assert stats["cpu_percent"] == 40.0
+
+
+@pytest.mark.parametrize("container_id,kwargs,expected", [
+    ("abc", {"follow": True, "tail": 0}, [b"hello\n", b"world\n"]),
+    ("tty", {}, [b"hello from tty\n"]),
+])
+def test_logs(socket_path, container_id, kwargs, expected):
+    response, _ = serve(socket_path, lambda c: collect(c.logs(container_id, **kwargs)))
+    assert b"".join(response) == b"".join(expected)
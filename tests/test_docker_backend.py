@@ -1,6 +1,16 @@
-from sen.docker_backend import DockerBackend
+import threading
+
+import pytest
+from flexmock import flexmock
+
+from sen.constants import DOCKER_CLIENT_POOL_SIZE, DOCKER_STREAM_POOL_SIZE
+from sen.docker_backend import (
+    DockerBackend, DockerContainer, parse_container_status, coalesce_events,
+    get_event_model_action, get_event_filters, EVENT_IGNORE, EVENT_REFRESH_CONTAINER, EVENT_REMOVE_CONTAINER,
+    EVENT_UPDATE_HEALTH, EVENT_REFRESH_IMAGE, EVENT_REMOVE_IMAGE, EVENT_RESYNC
+)
 from sen.util import calculate_cpu_percent2, calculate_cpu_percent
-from .real import image_data, mock, container_data
+from .real import image_data, mock, container_data, inspect_image_data
 
 
 def test_images_call():
@@ -61,3 +71,429 @@ def test_stats():
     for x in c0.d.stats('x', decode=True, stream=True):
         calculate_cpu_percent(x)
         _, s, t = calculate_cpu_percent2(x, t, s)
+
+
+def test_container_events_update_model():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    new_container_data = dict(container_data, Id="1234", Status="Up 2 seconds")
+    flexmock(b.client).should_receive("containers") \
+        .with_args(all=True, filters={"id": "1234"}) \
+        .and_return([new_container_data]).once()
+
+    b.apply_event({"Type": "container", "Action": "start", "Actor": {"ID": "1234"}})
+    containers = b.get_containers().response
+    assert [x.container_id for x in containers] == [container_data["Id"], "1234"]
+    assert b.get_container_by_id("1234").nice_status == "Up 2 seconds"
+
+    b.apply_event({"Type": "container", "Action": "destroy", "Actor": {"ID": "1234"}})
+    assert [x.container_id for x in b.get_containers().response] == [container_data["Id"]]
+
+
+def test_image_events_update_model():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    flexmock(b.client).should_receive("inspect_image") \
+        .with_args("fedora:latest").and_return(inspect_image_data[0]).once()
+
+    b.apply_event({"Type": "image", "Action": "pull", "Actor": {"ID": "fedora:latest"}})
+    new_image = b.get_image_by_id(inspect_image_data[0]["Id"])
+    assert new_image.short_name == "fedora:latest"
+    assert new_image.created_int == 1451942791
+    assert new_image in b.get_images().response
+
+    b.apply_event({"Type": "image", "Action": "delete", "Actor": {"ID": new_image.image_id}})
+    assert b.get_image_by_id(new_image.image_id) is None
+    assert [x.image_id for x in b.get_images().response] == [image_data[0]["Id"]]
+
+
+def test_coalesce_events():
+    events = [
+        {"Type": "container", "Action": "create", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "start", "Actor": {"ID": "b"}},
+        {"Type": "container", "Action": "commit", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "start", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "die", "Actor": {"ID": "b"}},
+    ]
+    assert coalesce_events(events) == [events[2], events[3], events[4]]
+    resync = {"Type": "sen", "Action": "resync", "status": "resync"}
+    assert coalesce_events(events + [resync, events[0]]) == [resync, events[0]]
+
+
+def test_coalesce_events_keeps_model_changes():
+    create = {"Type": "container", "Action": "create", "Actor": {"ID": "a"}}
+    start = {"Type": "container", "Action": "start", "Actor": {"ID": "a"}}
+    resize = {"Type": "container", "Action": "resize", "Actor": {"ID": "a"}}
+    health = {"Type": "container", "Action": "health_status: healthy", "Actor": {"ID": "a"}}
+    assert coalesce_events([create, start, resize]) == [start]
+    assert coalesce_events([start, health]) == [start]
+    assert coalesce_events([health, start]) == [start]
+    assert coalesce_events([health]) == [health]
+    assert coalesce_events([resize]) == []
+
+
+def test_apply_events_new_container():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    events = [
+        {"Type": "container", "Action": "create", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "start", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "resize", "Actor": {"ID": "a"}},
+    ]
+    flexmock(b).should_receive("_refresh_container").with_args("a").once()
+    assert b.apply_events(events) == [events[1]]
+
+
+def test_realtime_batches():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    events = [
+        {"Type": "container", "Action": "create", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "start", "Actor": {"ID": "a"}},
+        {"Type": "container", "Action": "pause", "Actor": {"ID": "a"}},
+    ]
+    flexmock(b).should_receive("realtime_updates").and_return(iter(events))
+    flexmock(b).should_receive("_refresh_container").with_args("a").once()
+    flexmock(threading.Timer).should_receive("start").once()
+
+    it = b.realtime_batches(window=1.0)
+    assert next(it) == [events[2]]
+
+
+@pytest.mark.parametrize("event,expected", [
+    ({"Type": "container", "Action": "exec_start: /bin/sh -c healthcheck"}, EVENT_IGNORE),
+    ({"Type": "container", "Action": "start"}, EVENT_REFRESH_CONTAINER),
+    ({"Type": "container", "Action": "destroy"}, EVENT_REMOVE_CONTAINER),
+    ({"Type": "container", "Action": "health_status: healthy"}, EVENT_UPDATE_HEALTH),
+    ({"Type": "container", "Action": "something-new"}, EVENT_RESYNC),
+    ({"Type": "image", "Action": "tag"}, EVENT_REFRESH_IMAGE),
+    ({"status": "delete", "id": "sha256:123"}, EVENT_REMOVE_IMAGE),
+    ({"Type": "network", "Action": "connect"}, EVENT_IGNORE),
+    ({"Type": "something-new", "Action": "create"}, EVENT_IGNORE),
+])
+def test_event_model_actions(event, expected):
+    assert get_event_model_action(event) == expected
+
+
+def test_event_filters():
+    assert get_event_filters(set()) is None
+    filters = get_event_filters({"container"})
+    assert filters["type"] == ["container"]
+    assert "start" in filters["event"]
+    assert "health_status" in filters["event"]
+    assert "exec_start" not in filters["event"]
+    assert "tag" not in filters["event"]
+    assert "tag" in get_event_filters({"container", "image"})["event"]
+
+
+class EventsStream:
+    """ yields provided events and then blocks until closed, same as docker-py """
+
+    def __init__(self, events, broken=False):
+        self.events = list(events)
+        self.closed = threading.Event()
+        if broken:
+            # connection is gone once the events are read
+            self.closed.set()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.events:
+            return self.events.pop(0)
+        self.closed.wait()
+        raise StopIteration
+
+    def close(self):
+        self.closed.set()
+
+
+def test_resubscribe_events():
+    mock()
+    b = DockerBackend()
+    b.set_event_types({"container", "image"})
+    b.resync()
+    start = {"Type": "container", "Action": "start", "id": "a"}
+    tag = {"Type": "image", "Action": "tag", "id": "b"}
+    flexmock(b.stream_client).should_receive("events") \
+        .with_args(decode=True, filters=get_event_filters({"container", "image"}), since=None) \
+        .and_return(EventsStream([tag])).once()
+    flexmock(b.stream_client).should_receive("events") \
+        .with_args(decode=True, filters=get_event_filters({"container"}), since=None) \
+        .and_return(EventsStream([start])).once()
+    flexmock(b).should_receive("resync").never()
+
+    it = b.realtime_updates()
+    assert next(it) == tag
+    b.set_event_types(["container"])
+    assert next(it) == start
+
+
+@pytest.mark.parametrize("replay,resync", [
+    # engine still has our last event in its buffer
+    ([1, 2], False),
+    # events were dropped from the buffer
+    ([2], True),
+])
+def test_resume_events(replay, resync):
+    mock()
+    b = DockerBackend()
+    b.set_event_types({"container", "image"})
+    b.resync()
+    events = [{"Type": "container", "Action": "start", "id": "a", "timeNano": 100 + i}
+              for i in range(3)]
+    filters = get_event_filters({"container", "image"})
+    flexmock(b.stream_client).should_receive("events") \
+        .with_args(decode=True, filters=filters, since=None) \
+        .and_return(EventsStream(events[:2], broken=True)).once()
+    flexmock(b.stream_client).should_receive("events") \
+        .with_args(decode=True, filters=filters, since="0.000000101") \
+        .and_return(EventsStream([events[i] for i in replay])).once()
+    flexmock(b).should_receive("resync").times(int(resync))
+
+    it = b.realtime_updates()
+    assert [next(it), next(it)] == events[:2]
+    if resync:
+        assert next(it)["Action"] == "resync"
+    else:
+        assert next(it) == events[2]
+
+
+def test_event_subscriptions():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    listing, dashboard, other = object(), object(), object()
+    b.subscriptions.subscribe(listing, "container")
+    b.subscriptions.subscribe(listing, "image")
+    b.subscriptions.subscribe(dashboard, "container", "a")
+    b.subscriptions.subscribe(other, "container", "b")
+    assert b._event_types == {"container", "image"}
+
+    start_a = {"Type": "container", "Action": "start", "id": "a"}
+    tag = {"Type": "image", "Action": "tag", "id": "x"}
+    resync = {"Type": "sen", "Action": "resync", "status": "resync"}
+    assert b.subscriptions.route([start_a, tag, resync]) == {
+        listing: [start_a, tag, resync],
+        dashboard: [start_a, resync],
+        other: [resync],
+    }
+
+    b.subscriptions.unsubscribe(listing)
+    assert b._event_types == {"container"}
+    assert b.subscriptions.route([start_a, tag]) == {dashboard: [start_a]}
+    # image events were not received meanwhile
+    b.subscriptions.subscribe(listing, "image")
+    assert b._event_types_resync
+
+
+def test_health_status_event():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    container_id = container_data["Id"]
+    flexmock(b.client).should_receive("containers").never()
+    flexmock(b.client).should_receive("inspect_container").never()
+
+    batch = b.apply_events([
+        {"Type": "container", "Action": "exec_create: true", "Actor": {"ID": container_id}},
+        {"Type": "container", "Action": "exec_start: true", "Actor": {"ID": container_id}},
+        {"Type": "container", "Action": "health_status: unhealthy", "Actor": {"ID": container_id}},
+    ])
+    assert len(batch) == 1
+    assert b.get_container_by_id(container_id).nice_status.endswith("(unhealthy)")
+
+    b.apply_event({"Type": "container", "Action": "health_status: healthy",
+                   "Actor": {"ID": container_id}})
+    assert b.get_container_by_id(container_id).nice_status.endswith(" (healthy)")
+    assert "unhealthy" not in b.get_container_by_id(container_id).nice_status
+    assert b.apply_events([{"Type": "container", "Action": "top", "Actor": {"ID": container_id}}]) == []
+
+
+def test_unknown_event_triggers_resync():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    flexmock(b).should_receive("resync").once()
+    b.apply_event({"Type": "container", "Action": "something-new", "Actor": {"ID": "1234"}})
+    # networks are not part of the model
+    b.apply_event({"Type": "network", "Action": "connect", "Actor": {"ID": "1234"}})
+
+
+def test_images_single_query():
+    mock()
+    b = DockerBackend()
+    layers = [
+        {"Id": "base", "ParentId": "", "Created": 1, "RepoTags": ["base:latest"]},
+        {"Id": "intermediate", "ParentId": "base", "Created": 2, "RepoTags": ["<none>:<none>"]},
+        {"Id": "app", "ParentId": "intermediate", "Created": 3, "RepoTags": ["app:1"]},
+        {"Id": "dangling", "ParentId": "base", "Created": 4, "RepoTags": None},
+        {"Id": "digested", "ParentId": "app", "Created": 5, "RepoTags": None,
+         "RepoDigests": ["app@sha256:1234"]},
+    ]
+    flexmock(b.client).should_receive("images").with_args(all=True).and_return(layers).once()
+    images = b.get_images(cached=False).response
+    assert [x.image_id for x in images] == ["base", "app", "dangling", "digested"]
+    assert b.get_image_by_id("intermediate") is not None
+
+
+def test_image_tree_index():
+    mock()
+    b = DockerBackend()
+    layers = [
+        {"Id": "base", "ParentId": "", "Created": 1, "RepoTags": ["base:latest"]},
+        {"Id": "second", "ParentId": "base", "Created": 3, "RepoTags": ["second:latest"]},
+        {"Id": "first", "ParentId": "base", "Created": 2, "RepoTags": ["first:latest"]},
+    ]
+    flexmock(b.client).should_receive("images").and_return(layers)
+    b.resync()
+    base = b.get_image_by_id("base")
+    first = b.get_image_by_id("first")
+    second = b.get_image_by_id("second")
+    assert b.scratch_image.children == [base]
+    assert base.children == [first, second]
+    assert first.parent_image is base
+    assert first.get_prev_sibling() is None
+    assert first.get_next_sibling() is second
+    assert second.get_prev_sibling() is first
+    assert second.get_next_sibling() is None
+    assert base.get_next_sibling() is None
+
+    inspect_data = {"Id": "between", "Parent": "base", "Created": "1970-01-01T00:00:02.5Z",
+                    "RepoTags": ["between:latest"]}
+    flexmock(b.client).should_receive("inspect_image").and_return(inspect_data)
+    b.apply_event({"Type": "image", "Action": "tag", "Actor": {"ID": "between"}})
+    between = b.get_image_by_id("between")
+    assert base.children == [first, between, second]
+    assert first.get_next_sibling() is between
+    assert second.get_prev_sibling() is between
+
+    b.apply_event({"Type": "image", "Action": "delete", "Actor": {"ID": "first"}})
+    assert base.children == [between, second]
+    assert between.get_prev_sibling() is None
+
+
+def test_containers_for_image():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    image_id = container_data["ImageID"]
+    assert [x.container_id for x in b.get_containers_for_image(image_id)] == [container_data["Id"]]
+
+    new_container_data = dict(container_data, Id="1234", ImageID="other-image")
+    flexmock(b.client).should_receive("containers") \
+        .with_args(all=True, filters={"id": "1234"}) \
+        .and_return([new_container_data])
+    b.apply_event({"Type": "container", "Action": "create", "Actor": {"ID": "1234"}})
+    assert [x.container_id for x in b.get_containers_for_image("other-image")] == ["1234"]
+
+    b.apply_event({"Type": "container", "Action": "destroy", "Actor": {"ID": container_data["Id"]}})
+    assert b.get_containers_for_image(image_id) == []
+
+
+@pytest.mark.parametrize("inp,expected", [
+    ("Up 2 hours", ("running", 0)),
+    ("Up 3 seconds (healthy)", ("running", 0)),
+    ("Up 2 hours (Paused)", ("paused", 0)),
+    ("Exited (0) 47 hours ago", ("exited", 0)),
+    ("Exited (137) 2 minutes ago", ("exited", 137)),
+    ("Created", ("created", 0)),
+    ("Restarting (1) 5 seconds ago", ("restarting", 1)),
+    ("Restarting (0) Less than a second ago", ("restarting", 0)),
+    ("Exited (-1) 3 days ago", ("exited", -1)),
+    ("Removal In Progress", ("removing", 0)),
+    ("Dead", ("dead", None)),
+    ("", (None, None)),
+    ("something new", (None, None)),
+])
+def test_parse_container_status(inp, expected):
+    assert parse_container_status(inp) == expected
+
+
+@pytest.mark.parametrize("data,running,status,exit_code", [
+    ({"Status": "Exited (0) 47 hours ago"}, False, "exited", 0),
+    ({"Status": "Exited (2) 47 hours ago", "State": "exited"}, False, "exited", 2),
+    ({"Status": "Up 2 hours (Paused)", "State": "paused"}, True, "paused", 0),
+    ({"Status": "Created", "State": "created"}, False, "created", 0),
+])
+def test_container_status_without_inspect(data, running, status, exit_code):
+    mock()
+    b = DockerBackend()
+    flexmock(b.client).should_receive("inspect_container").never()
+    c = DockerContainer(dict(container_data, **data), b)
+    assert c.running is running
+    assert c.simple_status == status
+    assert c.status_created is (status == "created")
+    assert c.exit_code == exit_code
+
+
+def test_sort_without_inspect():
+    mock()
+    b = DockerBackend()
+    flexmock(b.client).should_receive("inspect_container").never()
+    content, _, _ = b.filter(cached=False)
+    assert [x.object_id for x in content] == [image_data[0]["Id"], container_data["Id"]]
+
+
+def test_precise_sort():
+    mock()
+    b = DockerBackend()
+    inspect_data = {"State": {"StartedAt": "2017-07-14T02:40:00.123456789Z",
+                              "FinishedAt": "0001-01-01T00:00:00Z"}}
+    flexmock(b.client).should_receive("inspect_container") \
+        .with_args(container_data["Id"]).and_return(inspect_data).once()
+    content, _, _ = b.filter(cached=False, precise_sort=True)
+    assert [x.object_id for x in content] == [container_data["Id"], image_data[0]["Id"]]
+    assert content[0].precise_sort_value == 1500000000
+    # inspect data are cached now
+    b.filter(cached=True, precise_sort=True)
+    # inspect data don't change the default order
+    content, _, _ = b.filter(cached=True)
+    assert [x.object_id for x in content] == [image_data[0]["Id"], container_data["Id"]]
+    assert content[1].natural_sort_value == container_data["Created"]
+
+
+def test_prefetch_inspect():
+    mock()
+    b = DockerBackend()
+    b.resync()
+    release = threading.Event()
+    calls = []
+
+    def inspect_container(container_id):
+        calls.append(container_id)
+        release.wait(5)
+        return {"Id": container_id, "State": {"Status": "exited"}}
+
+    flexmock(b.client, inspect_container=inspect_container)
+    done = []
+    batch1 = b.prefetch_inspect([container_data["Id"], "not-there"], callback=done.append)
+    batch2 = b.prefetch_inspect([container_data["Id"]], callback=done.append)
+    assert not batch1.done()
+    release.set()
+    assert batch1.wait(5)
+    assert batch2.wait(5)
+    assert calls == [container_data["Id"]]
+    assert done == [batch1, batch2] or done == [batch2, batch1]
+    container = b.get_container_by_id(container_data["Id"])
+    assert container.metadata_get(["State", "Status"]) == "exited"
+
+    # already inspected
+    batch3 = b.prefetch_inspect([container_data["Id"]], wait=True)
+    assert batch3.done()
+    assert calls == [container_data["Id"]]
+
+
+def test_connection_pools():
+    mock()
+    b = DockerBackend()
+    assert b.client is not b.stream_client
+    assert b.stream_client.api_version == b.client.api_version
+    if b.client.base_url == "http+docker://localhost":
+        assert b.client._custom_adapter.max_pool_size == DOCKER_CLIENT_POOL_SIZE
+        assert b.stream_client._custom_adapter.max_pool_size == DOCKER_STREAM_POOL_SIZE
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+
+import docker
+import pytest
+from flexmock import flexmock
+
+from sen.docker_backend import DockerBackend
+from sen.tui.headless import HeadlessDriver, HeadlessScreen
+from sen.tui.init import Application
+from .real import mock, container_data
+from .test_docker_aio import STATS, chunked, get_handler, log_frame
+
+
+running_container_data = dict(container_data, Id="%064x" % 1, Names=["/busy_bose"],
+                              State="running", Status="Up 2 minutes")
+running_container_inspect = {
+    "Id": running_container_data["Id"],
+    "Name": "/busy_bose",
+    "Image": running_container_data["ImageID"],
+    "Config": {"Image": "banana", "Cmd": ["ls"], "Labels": {}},
+    "NetworkSettings": {"Ports": {}, "Networks": {}},
+    "State": {"Status": "running", "Running": True, "ExitCode": 0,
+              "StartedAt": "2024-07-10T02:00:00.000000000Z",
+              "FinishedAt": "0001-01-01T00:00:00Z"},
+}
+
+
+def get_driver(docker_backend, size=(120, 20)):
+    return HeadlessDriver(Application(docker_backend=docker_backend,
+                                      screen=HeadlessScreen(size=size)))
+
+
+@pytest.fixture
+def docker_engine(tmp_path, monkeypatch):
+    """
+    fake docker engine listening on a unix socket which streams events, stats and logs
+    """
+    socket_path = str(tmp_path / "docker.sock")
+    container_id = running_container_data["Id"]
+    responses = {
+        "/v1.41/events": (200, b"Transfer-Encoding: chunked\r\n\r\n"),
+        "/v1.41/containers/%s/stats" % container_id: (200, chunked(json.dumps(STATS).encode())),
+        "/v1.41/containers/%s/logs" % container_id: (
+            200, chunked(log_frame(1, b"streamed line\n"))),
+    }
+    requests = []
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    async def serve():
+        handler = get_handler(responses, requests, keep_open={"/v1.41/events"})
+        await asyncio.start_unix_server(handler, path=socket_path)
+        started.set()
+
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(serve(), loop)
+    started.wait()
+    monkeypatch.setenv("DOCKER_HOST", "unix://" + socket_path)
+    yield requests
+
+    async def stop():
+        # connection with the stream of events is still open
+        tasks = [x for x in asyncio.all_tasks() if x is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        loop.call_soon(loop.stop)
+    asyncio.run_coroutine_threadsafe(stop(), loop).result()
+
+
+def test_headless_listing_tree_and_logs():
+    mock()
+    flexmock(docker.APIClient, logs=lambda *args, **kwargs: b"first line\nsecond line\n")
+    b = DockerBackend()
+    # streams are read in threads, the stream of events never sends anything
+    b.aio_client = None
+    flexmock(b).should_receive("realtime_batches").and_return(iter(threading.Event().wait, True))
+    driver = get_driver(b)
+    container_name = container_data["Names"][0].lstrip("/")
+
+    async def script(d):
+        await d.wait_for_text(container_name)
+        # images are displayed before containers
+        await d.press("G")
+        await d.press("l")
+        await d.wait_for_text("second line")
+        await d.press("f5")
+        await d.wait_for_text("scratch")
+
+    driver.run(script)
+    assert all(len(x.lines) == 20 for x in driver.frames)
+    assert len(driver.latencies) == 3
+    assert all(x >= 0 for x in driver.latencies)
+
+
+def test_headless_streams_in_event_loop(docker_engine):
+    mock()
+    flexmock(docker.APIClient, containers=lambda *args, **kwargs: [running_container_data],
+             inspect_container=lambda *args, **kwargs: running_container_inspect,
+             logs=lambda *args, **kwargs: b"static line\n")
+    b = DockerBackend()
+    assert b.aio_client is not None
+
+    async def script(d):
+        await d.wait_for_text("busy_bose")
+        await d.press("G")
+        # follow logs
+        await d.press("f")
+        await d.wait_for_text("streamed line")
+        assert "static line" in d.text
+        await d.press("x")
+        await d.wait_for_text("busy_bose")
+        # dashboard with resource usage
+        await d.press("enter")
+        await d.wait_for_text("50.00 %")
+
+    get_driver(b, size=(160, 50)).run(script)
+    paths = [x.split("?", 1)[0] for x in docker_engine]
+    assert "/v1.41/events" in paths
+    assert "/v1.41/containers/%s/logs" % running_container_data["Id"] in paths
+    assert "/v1.41/containers/%s/stats" % running_container_data["Id"] in paths
@@ -1,21 +1,37 @@
+import asyncio
 import logging
 import random
+import threading
+import time
 from itertools import chain
 
 import pytest
+import docker
 from flexmock import flexmock
+import urwid
 from urwid.listbox import SimpleListWalker
 
+import sen.tui.views.main
+from sen.docker_backend import DockerBackend, DockerImage, DockerContainer
+from sen.exceptions import NotAvailableAnymore, NotifyError
+from sen.tui.constants import DEFERRED_CELL_PLACEHOLDER, MAIN_LIST_FOCUS
+from sen.tui.scheduler import UIThreadDispatcher
+# commands have to be imported before buffers
+from sen.tui.ui import ThreadSafeLoop
+from sen.tui.buffer import Buffer, LogsBuffer, InspectBuffer
+from sen.tui.views.main import MainListBox, MainLineWidget
 from sen.tui.widgets.list.base import WidgetBase
 from sen.tui.widgets.list.common import ScrollableListBox, AsyncScrollableListBox
 from sen.tui.widgets.list.util import ResponsiveRowWidget
 from sen.tui.widgets.table import ResponsiveTable, assemble_rows
+from .real import mock, image_data, inspect_image_data, container_data
 from .utils import get_random_text_widget
 from .constants import SCREEN_WIDTH, SCREEN_HEIGHT
 
 
 class MockUI:
     buffers = []
+    dispatcher = UIThreadDispatcher()
 
     def refresh(self):
         pass
@@ -79,7 +95,7 @@ def test_scrollable_listbox(inp, expected):
     (DataGenerator.stream(prefix="liné", return_bytes=True), DataGenerator.render(prefix="liné")),
 ])
 def test_async_scrollable_listbox(inp, expected):
-    ui = flexmock(refresh=lambda: None)
+    ui = flexmock(refresh=lambda: None, dispatcher=UIThreadDispatcher())
     lb = AsyncScrollableListBox(inp, ui)
     lb.thread.join()
     canvas = lb.render((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -101,6 +117,32 @@ def test_table_random_data():
     assert text[0].startswith(rows[0].original_widget.widget_list[0].text.encode("utf-8"))
 
 
+def test_table_column_widths_cached():
+    rows = [ResponsiveRowWidget([urwid.Text("a" * 3), urwid.Text("b" * 5)]) for _ in range(3)]
+    table = ResponsiveTable(MockUI(), SimpleListWalker(rows), responsive=False)
+    table.render((80, 20))
+    assert table.get_column_widths(80) == {0: 3, 1: 5}
+
+    # nothing changed: cells are not measured again
+    packed = []
+    for row in rows:
+        for cell in row.widgets:
+            cell.pack = lambda *args, cell=cell, pack=cell.pack: packed.append(cell) or pack(*args)
+    table.render((80, 20))
+    assert packed == []
+
+    rows[1].widgets[0].set_text("a" * 10)
+    table.row_changed(rows[1])
+    table.render((80, 20))
+    assert table.get_column_widths(80) == {0: 10, 1: 5}
+    assert rows[0].contents[0][1][1] == 10
+
+    # the longest row is removed
+    table.set_body([rows[0], rows[2]])
+    table.render((80, 20))
+    assert table.get_column_widths(80) == {0: 3, 1: 5}
+
+
 def test_table_empty():
     rows = []
     table = ResponsiveTable(MockUI(), SimpleListWalker(rows))
@@ -122,3 +164,328 @@ def test_assemble_rows_long_text():
     first_col, second_col = text[0].split(b" ", 1)
     assert first_col == rows[0][0].text.encode("utf-8")
     assert rows[0][1].text.encode("utf-8").startswith(second_col)
+
+
+def test_main_listing_deferred_cells():
+    mock()
+    b = DockerBackend()
+    release = threading.Event()
+    inspect_data = dict(inspect_image_data[0], Id=image_data[0]["Id"],
+                        Config={"Cmd": ["/usr/bin/deferred"]})
+
+    def inspect_image(image_id):
+        release.wait(5)
+        return inspect_data
+
+    flexmock(b.client, inspect_image=inspect_image)
+    flexmock(b.client, inspect_container=lambda x: {})
+    ui = MockUI()
+    listing = MainListBox(ui, b)
+    listing.refresh()
+    image_line = [x for x in listing.body if isinstance(x.docker_object, DockerImage)][0]
+    assert image_line.deferred
+    canvas = listing.render((SCREEN_WIDTH, SCREEN_HEIGHT))
+    text = b"".join([t for ln in canvas.content() for at, cs, t in ln])
+    assert DEFERRED_CELL_PLACEHOLDER.encode("utf-8") in text
+
+    release.set()
+    for _ in range(50):
+        if not image_line.deferred:
+            break
+        time.sleep(0.1)
+    assert not image_line.deferred
+    canvas = listing.render((SCREEN_WIDTH, SCREEN_HEIGHT))
+    text = b"".join([t for ln in canvas.content() for at, cs, t in ln])
+    assert b"/usr/bin/deferred" in text
+
+
+def test_main_listing_deferred_cells_inspect_failed():
+    mock()
+    b = DockerBackend()
+    inspected = []
+
+    def inspect_image(image_id):
+        inspected.append(image_id)
+        raise docker.errors.APIError("engine is gone")
+
+    flexmock(b.client, inspect_image=inspect_image)
+    listing = MainListBox(MockUI(), b)
+    listing.refresh()
+    image_line = [x for x in listing.body if isinstance(x.docker_object, DockerImage)][0]
+    flexmock(listing.ui).should_receive("refresh").never()
+    listing.render((SCREEN_WIDTH, SCREEN_HEIGHT))
+    for _ in range(50):
+        if image_line.retry_inspect_at is not None:
+            break
+        time.sleep(0.1)
+    # the line is not filled, which would query docker engine in the thread of the user
+    # interface; it's requested again once it's displayed after a while
+    assert image_line.retry_inspect_at is not None
+    assert image_line.deferred
+    listing.render((SCREEN_WIDTH, SCREEN_HEIGHT))
+    assert image_line.retry_inspect_at is not None
+    assert len(inspected) == 1
+    image_line.retry_inspect_at = time.monotonic() - 1
+    listing.render((SCREEN_WIDTH, SCREEN_HEIGHT))
+    assert image_line.retry_inspect_at is None
+    assert image_line.requested_priority is not None
+
+
+def test_hidden_buffer_refreshed_when_displayed():
+    class EventsBuffer(Buffer):
+        def __init__(self):
+            self.received = []
+            super().__init__()
+
+        def process_realtime_event(self, event):
+            self.received.append(event)
+
+    b = EventsBuffer()
+    b.show()
+    start = {"Type": "container", "Action": "start", "id": "a"}
+    b.process_realtime_events([start])
+    assert b.received == [start]
+
+    b.hide()
+    b.process_realtime_events([start])
+    b.process_realtime_events([start])
+    assert b.received == [start]
+    assert b.stale
+
+    b.show()
+    assert [x["Action"] for x in b.received] == ["start", "resync"]
+    assert not b.stale
+    b.show()
+    assert len(b.received) == 2
+
+
+def test_buffer_hibernation():
+    class HibernatingBuffer(Buffer):
+        def __init__(self):
+            self.calls = []
+            super().__init__()
+
+        def process_realtime_event(self, event):
+            self.calls.append("event")
+
+        def suspend(self):
+            self.calls.append("suspend")
+
+        def resume(self):
+            self.calls.append("resume")
+
+    b = HibernatingBuffer()
+    b.show()
+    b.hibernate()
+    assert b.calls == []
+
+    b.hide()
+    b.hibernate()
+    b.hibernate()
+    b.process_realtime_events([{"Type": "container", "Action": "start", "id": "a"}])
+    assert b.calls == ["suspend"]
+    b.show()
+    assert b.calls == ["suspend", "resume"]
+    assert not b.stale
+
+
+def test_async_scrollable_listbox_suspend():
+    ui = flexmock(refresh=lambda: None, dispatcher=UIThreadDispatcher())
+    lb = AsyncScrollableListBox(DataGenerator.stream(), ui, static_data="old1\nold2")
+    lb.thread.join()
+    assert len(lb.body) == 7
+    lb.suspend()
+    assert len(lb.body) == 0
+
+    lb.start(DataGenerator.stream(prefix="new"), static_data="old1")
+    lb.thread.join()
+    texts = [w.original_widget.text if hasattr(w, "original_widget") else w.text for w in lb.body]
+    assert texts == ["old1", "new1", "new2", "new3", "", "No more logs."]
+
+
+def test_redraw_rate_limit():
+    loop = ThreadSafeLoop(urwid.SolidFill(), screen=urwid.raw_display.Screen(), max_fps=10)
+    alarms = []
+    flexmock(loop).should_receive("set_alarm_in").replace_with(
+        lambda delay, callback: alarms.append((delay, callback)))
+    for _ in range(100):
+        loop.refresh()
+    assert len(alarms) == 1
+    assert alarms[0][0] == 0.0
+
+    alarms[0][1](loop, None)
+    loop.last_frame_at = time.monotonic()  # frame was just drawn
+    loop.refresh()
+    loop.refresh()
+    assert len(alarms) == 2
+    assert 0.0 < alarms[1][0] <= 0.1
+
+
+def test_main_listing_builds_only_displayed_lines():
+    mock()
+    b = DockerBackend()
+    containers = [DockerContainer(dict(container_data, Id="%064x" % x), b)
+                  for x in range(20000)]
+    flexmock(b).should_receive("filter").and_return(containers, None, None)
+    listing = MainListBox(MockUI(), b)
+    size = (SCREEN_WIDTH, 40)
+    built = []
+    row_factory = listing.body.row_factory
+    listing.body.row_factory = lambda x: built.append(x) or row_factory(x)
+
+    listing.refresh()
+    assert len(listing.body) == 20000
+    assert len(built) <= 1  # focused line
+    listing.render(size)
+    assert 0 < len(built) <= size[1] + 1
+    assert listing.focused_docker_object is containers[0]
+
+    for _ in range(50):
+        listing.keypress(size, "page down")
+        listing.render(size)
+    assert listing.focused_docker_object is not containers[0]
+    assert len(listing.body.built_rows()) <= listing.body.cache_size
+
+
+def test_main_listing_refresh_reuses_lines():
+    mock()
+    b = DockerBackend()
+    containers = [DockerContainer(dict(container_data, Id="%064x" % x), b) for x in range(10)]
+    listing = MainListBox(MockUI(), b)
+    size = (SCREEN_WIDTH, 20)
+    flexmock(b).should_receive("filter").and_return(containers, None, None).once()
+    listing.refresh()
+    listing.render(size)
+    listing.set_focus(5)
+    lines = {x.docker_object.object_id: x for x in listing.body.built_rows()}
+
+    # a container was created and another one was updated
+    new = DockerContainer(dict(container_data, Id="%064x" % 100), b)
+    updated = DockerContainer(dict(container_data, Id=containers[7].object_id), b)
+    new_containers = [new] + containers[:7] + [updated] + containers[8:]
+    flexmock(b).should_receive("filter").and_return(new_containers, None, None).once()
+    built = []
+    row_factory = listing.body.row_factory
+    listing.body.row_factory = lambda x: built.append(x) or row_factory(x)
+    listing.refresh(cached=True)
+    listing.render(size)
+
+    assert built == [new, updated]
+    assert listing.focused_docker_object is containers[5]
+    for line in listing.body.built_rows():
+        if line.docker_object not in built:
+            assert lines[line.docker_object.object_id] is line
+
+
+def test_row_canvases_cached_across_focus_changes():
+    mock()
+    b = DockerBackend()
+    line = MainLineWidget(DockerContainer(container_data, b))
+    size = (SCREEN_WIDTH, )
+    normal = line.render(size, focus=False)
+    focused = line.render(size, focus=True)
+    assert {a for row in focused.content() for a, _, _ in row} == {MAIN_LIST_FOCUS}
+    assert MAIN_LIST_FOCUS not in {a for row in normal.content() for a, _, _ in row}
+    # moving focus composes the cached canvases
+    assert line.render(size, focus=False) is normal
+    assert line.render(size, focus=True) is focused
+
+    line.widgets[-1].text = "changed"
+    assert line.render(size, focus=False) is not normal
+
+
+def test_logs_buffer_follows_logs_in_event_loop():
+    mock()
+    flexmock(docker.APIClient, logs=lambda *args, **kwargs: b"old1\nold2\n")
+    b = DockerBackend()
+    container = DockerContainer(container_data, b)
+
+    async def logs(container_id, follow=False, tail="all"):
+        assert (container_id, follow, tail) == (container.container_id, True, 0)
+        yield b"new1\n"
+        yield b"new2\n"
+    b.aio_client = flexmock(logs=logs)
+    coroutines = []
+    ui = flexmock(refresh=lambda: None, dispatcher=UIThreadDispatcher(),
+                  notify_message=lambda *args, **kwargs: None,
+                  remove_notification_message=lambda *args, **kwargs: None,
+                  notify_widget=lambda *args, **kwargs: None,
+                  run_coroutine=coroutines.append)
+
+    buffer = LogsBuffer(ui, container, follow=True)
+    assert len(coroutines) == 1
+    asyncio.run(coroutines[0])
+    texts = [w.original_widget.text if hasattr(w, "original_widget") else w.text
+             for w in buffer.widget.body]
+    assert texts == ["old1", "old2", "new1", "new2", "", "No more logs."]
+
+
+def test_buffers_have_own_locks():
+    class SlowBuffer(Buffer):
+        def __init__(self):
+            self.suspending = threading.Event()
+            self.release = threading.Event()
+            super().__init__()
+
+        def suspend(self):
+            self.suspending.set()
+            self.release.wait()
+
+    assert Buffer()._display_lock is not Buffer()._display_lock
+    slow, other = SlowBuffer(), SlowBuffer()
+    other.release.set()
+    t = threading.Thread(target=slow.hibernate)
+    t.start()
+    slow.suspending.wait()
+    # hibernation of one buffer doesn't hold up the others
+    other.hibernate()
+    other.show()
+    assert other.displayed and not other.hibernating
+    slow.release.set()
+    t.join()
+
+
+def test_buffer_subscriptions():
+    mock()
+    b = DockerBackend()
+    image = b.get_images().response[0]
+    buffer = InspectBuffer(MockUI(), image)
+    assert b.subscriptions.object_types == {"image"}
+    buffer.process_realtime_events([{"Type": "image", "Action": "tag", "id": image.image_id}])
+    buffer.destroy()
+    assert b.subscriptions.object_types == set()
+
+    class BrokenBuffer(Buffer):
+        def __init__(self):
+            super().__init__([(b, "image", None)])
+
+        def refresh(self):
+            raise NotifyError("can't load")
+
+    with pytest.raises(NotifyError):
+        BrokenBuffer()
+    # half-built buffer doesn't receive events
+    assert b.subscriptions.object_types == set()
+
+
+def test_main_listing_object_removed_before_displayed():
+    mock()
+    b = DockerBackend()
+    container = DockerContainer(container_data, b)
+    flexmock(b).should_receive("filter").and_return([container], None, None)
+    flexmock(sen.tui.views.main).should_receive("get_row").and_raise(NotAvailableAnymore)
+    listing = MainListBox(MockUI(), b)
+    listing.refresh()
+    canvas = listing.render((SCREEN_WIDTH, SCREEN_HEIGHT))
+    text = b"".join([t for ln in canvas.content() for at, cs, t in ln])
+    assert b"not available anymore" in text
+    assert listing.focused_docker_object is container
+
+
+def test_main_listing_precise_order_query():
+    mock()
+    b = DockerBackend()
+    flexmock(b).should_receive("filter").with_args(
+        cached=False, containers=True, images=True, precise_sort=True).and_return([], None, None).once()
+    listing = MainListBox(MockUI(), b)
+    listing.refresh(query="order=precise")